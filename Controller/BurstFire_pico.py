@@ -0,0 +1,70 @@
+from array import array
+
+# Duty interno em centésimos de ponto percentual (0..10000) para trabalhar só com inteiros
+DUTY_FULL = 10000
+# Janela máxima do relatório (~2,4 h a 60 Hz): ao atingir, os contadores são divididos por 2,
+# preservando a proporção sem nunca passar de small int dentro da IRQ
+JANELA_MAX = 1 << 20
+
+
+class BurstFiring:
+    """Disparo por meios-ciclos inteiros da rede para SSR de passagem por zero.
+
+    A cada passagem por zero step() decide, por canal, se o próximo meio-ciclo conduz.
+    A decisão é um sigma-delta (Bresenham): o duty comandado é acumulado e o canal
+    dispara quando o acumulador estoura, o que espalha os meios-ciclos ligados de
+    forma uniforme (menos cintilação que rajadas longas). Com ciclo_completo=True a
+    decisão vale para o ciclo inteiro (dois meios-ciclos), evitando componente DC na carga.
+    """
+    def __init__(self, bits, ciclo_completo=True):
+        n = len(bits)
+        self.bits = bits  # Máscara de saída de cada canal (ex.: 1 << GPIO)
+        self.ciclo_completo = ciclo_completo
+        self._duty = array('i', [0] * n)
+        self._acum = array('i', [DUTY_FULL // 2] * n)
+        self._on_count = array('i', [0] * n)
+        self._janela = 0     # Meios-ciclos contados desde o último reset_report (até JANELA_MAX)
+        self._impar = False  # Próximo meio-ciclo é o segundo do ciclo
+        self.on_mask = 0
+
+    def set_duty(self, i, duty):
+        """Duty do canal i em % (0 a 100)"""
+        self._duty[i] = int(max(0, min(100, duty)) * (DUTY_FULL // 100))
+
+    def step(self):
+        """Chamado a cada passagem por zero; retorna a máscara dos canais que conduzem (sem alocação)"""
+        if self.ciclo_completo and self._impar:
+            mask = self.on_mask  # Segundo meio-ciclo: repete a decisão do primeiro
+        else:
+            mask = 0
+            duty = self._duty
+            acum = self._acum
+            bits = self.bits
+            for i in range(len(bits)):
+                a = acum[i] + duty[i]
+                if a >= DUTY_FULL:
+                    a -= DUTY_FULL
+                    mask |= bits[i]
+                acum[i] = a
+        for i in range(len(self.bits)):
+            if mask & self.bits[i]:
+                self._on_count[i] += 1
+        self._janela += 1
+        if self._janela >= JANELA_MAX:
+            self._janela >>= 1
+            for i in range(len(self._on_count)):
+                self._on_count[i] >>= 1
+        self._impar = not self._impar
+        self.on_mask = mask
+        return mask
+
+    def duty_real(self, i):
+        """Duty obtido pelo canal desde o último reset_report (em %)"""
+        if self._janela == 0:
+            return 0.0
+        return self._on_count[i] * 100 / self._janela
+
+    def reset_report(self):
+        for i in range(len(self._on_count)):
+            self._on_count[i] = 0
+        self._janela = 0
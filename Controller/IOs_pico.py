@@ -1,10 +1,45 @@
 import machine
+import sys
 import time
 import _thread
-from machine import Pin, UART
+from array import array
+from machine import Pin, UART, PWM, Timer
+from Controller.BurstFire_pico import BurstFiring
+from Controller.Modbus_pico import (crc16_modbus, ModbusRtuCodec, DeviceRecord, PTA_POLL_MAP,
+                                    FUNC_READ_HOLDING, FUNC_READ_INPUT, RttEstimator, SlaveHealth,
+                                    ModbusTransaction, TX_PENDING, TX_DONE, HEALTH_HEALTHY, HEALTH_OPEN,
+                                    HEALTH_HALF_OPEN, HEALTH_NAMES)
+
+# Modos de acionamento das saídas de aquecimento
+MODO_PWM_HW = 'pwm'        # machine.PWM: todos os canais em paralelo pelo hardware, sem thread
+MODO_TICK = 'tick'         # Proporcional no tempo por Timer (SSR): todos os canais no mesmo tick
+MODO_ZERO_CROSS = 'zc'     # Meios-ciclos inteiros sincronizados com a passagem por zero (SSR zero-cross)
+MODO_THREAD = 'thread'     # Legado: bit-bang em thread no core1
+
+# Faixa segura de frequência do PWM de hardware (abaixo de ~8 Hz o divisor do RP2040 satura)
+PWM_FREQ_MIN = 10
+PWM_FREQ_MAX = 1000
+
+# Registradores do SIO para escrever várias saídas de uma vez: (GPIO_OUT, GPIO_OUT_XOR)
+SIO_BASE = 0xD0000000
+_SIO_OFFSETS = {
+    'RP2040': (0x010, 0x01C),
+    'RP2350': (0x010, 0x028),
+}
+
+
+def _sio_registers():
+    """Endereços de GPIO_OUT/GPIO_OUT_XOR do chip atual, ou None se não for RP2040/RP2350"""
+    nome = getattr(sys.implementation, '_machine', '')
+    for chip, (out, xor) in _SIO_OFFSETS.items():
+        if chip in nome:
+            return SIO_BASE + out, SIO_BASE + xor
+    return None
+
 
 class InOut:
-    def __init__(self):
+    def __init__(self, modo=MODO_PWM_HW, pwm_freq=PWM_FREQ_MIN, tick_ms=10,
+                 defasagem=True, max_simultaneas=None, pino_zc=2, ciclo_completo=True, scheduler=None):
         # Pinos conforme mapeamento solicitado (GPIO do Raspberry Pi Pico)
         self.SAIDA_PWM_1 = 12
         self.SAIDA_PWM_2 = 11
@@ -44,8 +79,105 @@ class InOut:
             self.SAIDA_PWM_6: 0
         }
 
-        # Inicia thread PWM usando _thread (limitado a 2 cores no Pi Pico 2)
         self.pwm_lock = _thread.allocate_lock()
+        self.pwm_hw = {}
+        if modo == MODO_PWM_HW and max_simultaneas is not None:
+            # Os canais do PWM de hardware viram juntos: limite de carga e defasagem só no modo tick
+            print(f"Máximo de {max_simultaneas} saídas ligadas: usando saídas por tick")
+            modo = MODO_TICK
+        self.modo = modo
+
+        # Estado do escalonador por tick (índice = saída - 1)
+        self._saidas = [self.SAIDA_PWM_1, self.SAIDA_PWM_2, self.SAIDA_PWM_3,
+                        self.SAIDA_PWM_4, self.SAIDA_PWM_5, self.SAIDA_PWM_6]
+        self._pins_ordem = [self.pwm_pins[p] for p in self._saidas]
+        self._indice = {p: i for i, p in enumerate(self._saidas)}
+        n = len(self._saidas)
+        # Máscaras para aplicar todas as saídas em uma única escrita no SIO
+        self._bits = [1 << p for p in self._saidas]
+        self._mask_todos = 0
+        for bit in self._bits:
+            self._mask_todos |= bit
+        self._sio = _sio_registers()
+        self.tick_ms = tick_ms
+        self._timer = None
+        self._periodo_ms = array('i', [int(self.pwm_period * 1000)] * n)
+        self._fase_ms = array('i', [0] * n)
+        self._on_ms = array('i', [0] * n)           # Tempo ligado comandado por período
+        self._acum_on_ms = array('i', [0] * n)      # Tempo ligado no período em curso
+        self._on_medido_ms = array('i', [0] * n)    # Tempo ligado no último período completo
+        # Limite de carga: fases distribuídas no período e, opcionalmente, máximo de zonas ligadas juntas
+        self.defasagem = defasagem
+        self.max_simultaneas = max_simultaneas
+        self._restante_ms = array('i', [0] * n)     # Pulso ainda a entregar na janela (modo com limite)
+        self._pulso_mask = 0                         # Canais no meio do pulso (modo com limite)
+        self._deve_us = array('i', [0] * n)         # Tempo comandado - entregue, normalizado pelo duty
+        self._defasa()
+
+        self.scheduler = scheduler  # Antes de qualquer retorno: cleanup() consulta o escalonador
+        self._burst = None
+        self._zc_pin = None
+        if modo == MODO_ZERO_CROSS:
+            try:
+                # Detector de passagem por zero: um pulso por meio-ciclo da rede no pino_zc
+                self._burst = BurstFiring(self._bits, ciclo_completo=ciclo_completo)
+                self._zc_pin = Pin(pino_zc, Pin.IN, Pin.PULL_UP)
+                try:
+                    self._zc_pin.irq(trigger=Pin.IRQ_RISING, handler=self._zero_cross, hard=True)
+                except TypeError:
+                    self._zc_pin.irq(trigger=Pin.IRQ_RISING, handler=self._zero_cross)
+                self.pwm_thread_running = False
+                print(f"Saídas por meio-ciclo sincronizadas no GP{pino_zc}")
+                return
+            except Exception as e:
+                print(f"Aviso passagem por zero: {e}")
+                print("Usando PWM por thread")
+                self._burst = None
+                self.modo = MODO_THREAD
+
+        # Com escalonador do core1 (Controller/Scheduler_pico) o tick vira tarefa dele, sem Timer nem thread
+        if modo == MODO_TICK and scheduler is not None:
+            self._usa_escalonador()
+            return
+
+        if modo == MODO_TICK:
+            try:
+                self._timer = Timer()
+                self._timer.init(mode=Timer.PERIODIC, period=tick_ms, callback=self._tick)
+                self.pwm_thread_running = False
+                print(f"Saídas por tick de {tick_ms} ms (período {self.pwm_period}s)")
+                return
+            except Exception as e:
+                print(f"Aviso Timer: {e}")
+                print("Usando PWM por thread")
+                self._timer = None
+                self.modo = MODO_THREAD
+
+        if modo == MODO_PWM_HW:
+            try:
+                # Cada saída vira um canal de PWM de hardware; o período corre em paralelo nos 6 canais
+                self.pwm_freq = max(PWM_FREQ_MIN, min(PWM_FREQ_MAX, int(pwm_freq)))
+                self.pwm_period = 1.0 / self.pwm_freq
+                for pin_num, pin_obj in self.pwm_pins.items():
+                    pwm = PWM(pin_obj)
+                    pwm.freq(self.pwm_freq)
+                    pwm.duty_u16(self._duty_u16(0))
+                    self.pwm_hw[pin_num] = pwm
+                self.pwm_thread_running = False
+                print(f"PWM de hardware ativo: {self.pwm_freq} Hz em {len(self.pwm_hw)} canais")
+                return
+            except Exception as e:
+                print(f"Aviso PWM hardware: {e}")
+                print("Usando PWM por thread")
+                self._release_pwm_hw()
+                self.modo = MODO_THREAD
+
+        if scheduler is not None:
+            # O core1 é do escalonador: no lugar da thread PWM, o escalonador por tick
+            self._usa_escalonador()
+            return
+
+        # Inicia thread PWM usando _thread (limitado a 2 cores no Pi Pico 2)
         try:
             _thread.start_new_thread(self._pwm_control_all, ())
             print("Thread PWM iniciada no core1")
@@ -54,6 +186,29 @@ class InOut:
             print("PWM funcionará em modo síncrono")
             self.pwm_thread_running = False
 
+    def _usa_escalonador(self):
+        self.modo = MODO_TICK
+        self.pwm_thread_running = False
+        self.pwm_period = self._periodo_ms[0] / 1000
+        self.scheduler.add('saidas', self._tick, self.tick_ms)
+        print(f"Saídas por tick de {self.tick_ms} ms no escalonador (período {self.pwm_period}s)")
+
+    @staticmethod
+    def _duty_u16(duty_cycle):
+        # Saídas ativas em LOW: o tempo em nível alto é o complemento do duty comandado
+        return 65535 - int(duty_cycle * 65535 // 100)
+
+    def _release_pwm_hw(self):
+        for pin_num, pwm in self.pwm_hw.items():
+            try:
+                pwm.deinit()
+            except Exception:
+                pass
+            # Após o deinit o pino volta a ser GPIO comum, em HIGH (inativo)
+            self.pwm_pins[pin_num] = Pin(pin_num, Pin.OUT)
+            self.pwm_pins[pin_num].on()
+        self.pwm_hw = {}
+
     @property
     def get_aciona_maquina(self):
         if self.entrada_maquina_pin.value() == 0:  # LOW
@@ -61,6 +216,170 @@ class InOut:
         else:
             return 0
 
+    def _defasa(self):
+        """Distribui o início do período de cada canal para que as zonas não liguem juntas"""
+        n = len(self._saidas)
+        for i in range(n):
+            self._fase_ms[i] = (i * self._periodo_ms[i]) // n if self.defasagem else 0
+
+    def set_max_simultaneas(self, max_simultaneas):
+        """Máximo de saídas ligadas ao mesmo tempo no modo tick (None = sem limite).
+
+        Nos outros modos o limite não tem efeito: crie o InOut com max_simultaneas para usar o modo tick.
+        """
+        if self.modo != MODO_TICK:
+            print("Aviso: limite de saídas simultâneas só vale no modo tick")
+        with self.pwm_lock:
+            self.max_simultaneas = max_simultaneas
+            for i in range(len(self._restante_ms)):
+                self._restante_ms[i] = 0
+                self._deve_us[i] = 0
+            self._pulso_mask = 0
+
+    def _tick(self, timer=None):
+        """Um passo do escalonador: avança a fase de cada canal e aplica as saídas (sem alocação)"""
+        t = self.tick_ms
+        periodo = self._periodo_ms
+        fase_ms = self._fase_ms
+        on_ms = self._on_ms
+        acum = self._acum_on_ms
+        restante = self._restante_ms
+        bits = self._bits
+        limite = self.max_simultaneas
+        on_mask = 0
+        for i in range(len(bits)):
+            fase = fase_ms[i] + t
+            if fase >= periodo[i]:
+                fase -= periodo[i]
+                self._on_medido_ms[i] = acum[i]
+                acum[i] = 0
+                if limite is not None:
+                    # Início da janela: pulso do duty comandado mais o que faltou entregar na anterior;
+                    # o canal disputa a vaga de novo (sem isso quem está ligado nunca libera com sobrecarga)
+                    restante[i] = min(periodo[i], on_ms[i] + restante[i])
+                    self._pulso_mask &= ~bits[i]
+            fase_ms[i] = fase
+            if limite is None:
+                if fase < on_ms[i]:
+                    on_mask |= bits[i]
+        if limite is not None:
+            on_mask = self._seleciona(limite)
+        for i in range(len(bits)):
+            if on_mask & bits[i]:
+                acum[i] += t
+        self._apply_mask(on_mask)
+
+    def _seleciona(self, limite):
+        """Liga no máximo 'limite' canais repartindo as vagas na proporção do duty comandado.
+
+        O pulso de cada canal é definido no início da sua janela (fases defasadas por _defasa) e o
+        que não couber passa para a janela seguinte. _deve_us acumula o tempo comandado menos o
+        entregue, normalizado pelo duty: quem tem pulso pendente disputa vaga livre pela maior dívida
+        e toma a vaga do canal ligado de menor dívida quando a diferença passa de um quantum
+        (período / número de canais). Assim os pulsos seguem contínuos e, com sobrecarga, cada
+        canal recebe a mesma fração do seu comando, independente da fase.
+        """
+        periodo = self._periodo_ms
+        restante = self._restante_ms
+        on_ms = self._on_ms
+        deve = self._deve_us
+        bits = self._bits
+        n = len(bits)
+        t = self.tick_ms
+        mask = 0
+        ligados = 0
+        for i in range(n):
+            if on_ms[i] == 0:
+                restante[i] = 0  # Duty zerado (ex.: controle desligado): corta o pulso já
+                deve[i] = 0
+            elif self._pulso_mask & bits[i] and restante[i] > 0:
+                mask |= bits[i]
+                ligados += 1
+        while ligados < limite:
+            best = self._maior_divida(mask)
+            if best < 0:
+                break
+            mask |= bits[best]
+            ligados += 1
+        while True:
+            best = self._maior_divida(mask)
+            if best < 0:
+                break
+            menor = -1
+            for i in range(n):
+                if mask & bits[i] and (menor < 0 or deve[i] < deve[menor]):
+                    menor = i
+            if menor < 0 or deve[best] - deve[menor] <= 1000 * (periodo[best] // n):
+                break
+            mask = (mask & ~bits[menor]) | bits[best]
+        pulso = 0
+        minimo = -1
+        for i in range(n):
+            if on_ms[i] == 0:
+                continue
+            deve[i] += 1000 * t
+            if mask & bits[i]:
+                deve[i] -= (1000 * t * periodo[i]) // on_ms[i]
+                restante[i] = max(0, restante[i] - t)
+                if restante[i] > 0:
+                    pulso |= bits[i]
+            if minimo < 0 or deve[i] < deve[minimo]:
+                minimo = i
+        if minimo >= 0 and deve[minimo] > 0:
+            # Só a diferença entre canais importa: desconta a menor dívida para manter os valores limitados
+            desconto = deve[minimo]
+            for i in range(n):
+                if on_ms[i]:
+                    deve[i] -= desconto
+        self._pulso_mask = pulso
+        return mask
+
+    def _maior_divida(self, mask):
+        """Canal fora de 'mask' com pulso pendente e maior dívida (-1 se nenhum)"""
+        deve = self._deve_us
+        restante = self._restante_ms
+        bits = self._bits
+        best = -1
+        for i in range(len(bits)):
+            if mask & bits[i] or restante[i] <= 0:
+                continue
+            if best < 0 or deve[i] > deve[best]:
+                best = i
+        return best
+
+    def _apply_mask(self, on_mask):
+        """Aplica o estado de todas as saídas de uma vez (bit em 1 = saída ligada)"""
+        nivel = self._mask_todos & ~on_mask  # Saídas ativas em LOW: ligada = nível 0
+        if self._sio is not None:
+            out_reg, xor_reg = self._sio
+            # Um único store no GPIO_OUT_XOR inverte só os pinos que mudaram: sem defasagem entre zonas
+            machine.mem32[xor_reg] = (machine.mem32[out_reg] ^ nivel) & self._mask_todos
+        else:
+            pins = self._pins_ordem
+            for i in range(len(pins)):
+                pins[i].value(1 if nivel & self._bits[i] else 0)
+
+    def _zero_cross(self, pin=None):
+        """IRQ da passagem por zero: decide e aplica os canais do próximo meio-ciclo"""
+        self._apply_mask(self._burst.step())
+
+    def get_duty_report(self):
+        """Duty comandado x duty obtido (modo tick: último período; modo zc: desde o último relatório)"""
+        report = []
+        for i, pin_num in enumerate(self._saidas):
+            if self._burst is not None:
+                real = self._burst.duty_real(i)
+            else:
+                real = self._on_medido_ms[i] * 100 / self._periodo_ms[i]
+            report.append({
+                'saida': i + 1,
+                'comandado': self.pwm_duty_cycles[pin_num],
+                'real': real
+            })
+        if self._burst is not None:
+            self._burst.reset_report()
+        return report
+
     def _pwm_control_all(self):
         """Controla PWM de todos os pinos em uma única thread para economizar recursos"""
         while self.pwm_thread_running:
@@ -85,35 +404,80 @@ class InOut:
                 else:
                     pin_obj.on()  # Mantém HIGH quando duty cycle = 0
 
-    def set_pwm_period(self, period):
+    def set_pwm_period(self, period, saida=None):
+        """Período do PWM em segundos; no modo tick pode ser definido por saída (1 a 6)"""
         with self.pwm_lock:
+            if self.modo == MODO_TICK:
+                periodo_ms = max(self.tick_ms, int(period * 1000))
+                for i, pin_num in enumerate(self._saidas):
+                    if saida is None or saida == i + 1:
+                        self._periodo_ms[i] = periodo_ms
+                        self._on_ms[i] = int(periodo_ms * self.pwm_duty_cycles[pin_num] // 100)
+                if saida is None:
+                    self.pwm_period = period
+                self._defasa()
+                return
+            if self.pwm_hw:
+                freq = max(PWM_FREQ_MIN, min(PWM_FREQ_MAX, int(1 / period)))
+                if freq != int(1 / period):
+                    print(f"Período {period}s fora da faixa do PWM de hardware, usando {freq} Hz")
+                for pwm in self.pwm_hw.values():
+                    pwm.freq(freq)
+                # Mudar a frequência altera o topo do contador: reaplica os duties
+                for pin_num, pwm in self.pwm_hw.items():
+                    pwm.duty_u16(self._duty_u16(self.pwm_duty_cycles[pin_num]))
+                self.pwm_freq = freq
+                period = 1.0 / freq
             self.pwm_period = period
 
+    def _set_duty(self, i, duty_cycle):
+        """Atualiza o duty da saída de índice i (chamar com pwm_lock adquirido)"""
+        pin = self._saidas[i]
+        duty_cycle = max(0, min(100, duty_cycle))
+        self.pwm_duty_cycles[pin] = duty_cycle
+        pwm = self.pwm_hw.get(pin)
+        if pwm is not None:
+            pwm.duty_u16(self._duty_u16(duty_cycle))  # Só atualiza o registrador do canal
+        elif self.modo == MODO_TICK:
+            self._on_ms[i] = int(self._periodo_ms[i] * duty_cycle // 100)
+        elif self._burst is not None:
+            self._burst.set_duty(i, duty_cycle)
+
     def set_pwm_duty_cycle(self, pin, duty_cycle):
-        if pin in self.pwm_duty_cycles:
+        i = self._indice.get(pin)
+        if i is not None:
             with self.pwm_lock:
-                self.pwm_duty_cycles[pin] = max(0, min(100, duty_cycle))
+                self._set_duty(i, duty_cycle)
+
+    def set_all_duty(self, duties, saidas=None):
+        """Atualiza várias saídas com uma única aquisição do lock (saídas 1..n por padrão)"""
+        n = len(self._saidas)
+        with self.pwm_lock:
+            for k in range(len(duties)):
+                saida = saidas[k] if saidas is not None else k + 1
+                if 1 <= saida <= n:
+                    self._set_duty(saida - 1, duties[k])
 
     def aciona_pwm(self, duty_cycle, saida):
-        if saida == 1:
-            self.set_pwm_duty_cycle(self.SAIDA_PWM_1, duty_cycle)
-        elif saida == 2:
-            self.set_pwm_duty_cycle(self.SAIDA_PWM_2, duty_cycle)
-        elif saida == 3:
-            self.set_pwm_duty_cycle(self.SAIDA_PWM_3, duty_cycle)
-        elif saida == 4:
-            self.set_pwm_duty_cycle(self.SAIDA_PWM_4, duty_cycle)
-        elif saida == 5:
-            self.set_pwm_duty_cycle(self.SAIDA_PWM_5, duty_cycle)
-        elif saida == 6:
-            self.set_pwm_duty_cycle(self.SAIDA_PWM_6, duty_cycle)
+        if 1 <= saida <= len(self._saidas):
+            self.set_pwm_duty_cycle(self._saidas[saida - 1], duty_cycle)
 
     def cleanup(self):
+        if self._zc_pin is not None:
+            self._zc_pin.irq(handler=None)
+            self._zc_pin = None
+            self._burst = None
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        if self.scheduler is not None:
+            self.scheduler.remove('saidas')
         self.pwm_thread_running = False
         time.sleep_ms(100)  # Aguarda a thread PWM terminar
+        self._release_pwm_hw()
         # Desliga todos os pinos PWM
-        for pin_obj in self.pwm_pins.values():
-            pin_obj.on()  # HIGH = inativo
+        self._pins_ordem = [self.pwm_pins[p] for p in self._saidas]
+        self._apply_mask(0)
 
     def aciona_maquina_pronta(self, status):
         if status:
@@ -123,133 +487,386 @@ class InOut:
 
 
 class IO_MODBUS:
-    def __init__(self, dado=None, uart_id=0, baudrate=9600, tx_pin=0, rx_pin=1, timeout=1.0):
+    def __init__(self, dado=None, uart_id=0, baudrate=9600, tx_pin=0, rx_pin=1, timeout=1.0,
+                 poll_map=PTA_POLL_MAP, min_timeout_ms=30, cycle_budget_ms=600,
+                 uart1_pins=None, bus_map=None, modo_saida=MODO_PWM_HW, scheduler=None,
+                 max_simultaneas=None):
         self.dado = dado
         self.fake_modbus = True
         self.timeout = timeout
+        self.codec = None
+        # Barramentos: índice 0 = UART principal, índice 1 = UART1 opcional (uart1_pins=(tx, rx))
+        self.uarts = []
+        self.codecs = []
+        self.transacoes = []
+        self.bus_map = bus_map or {}  # endereço -> índice do barramento (padrão 0)
+        self._scan_next = [0, 0]
+        self._scan_cur = [-1, -1]
+        # Varredura em andamento (atributos e buffer reaproveitados: scan_start/scan_poll não alocam)
+        self._scan_ativo = False
+        self._scan_adrs = None
+        self._scan_values = None
+        self._scan_ticks = None
+        self._scan_on_sample = None
+        self._scan_zonas = array('b')  # Ordem das zonas da varredura (cresce só se houver mais zonas)
+        self._scan_count = 0
+        self.poll_map = poll_map
+        self.records = {}  # Último registro lido de cada escravo (endereço -> DeviceRecord)
+
+        # Timeout adaptativo por escravo: parte de 'timeout' e converge para o RTT medido
+        self.min_timeout_ms = min_timeout_ms
+        self.rtt = {}  # endereço -> RttEstimator
+        self.health = {}  # endereço -> SlaveHealth (circuit breaker)
+        # Orçamento de tempo de barramento por ciclo de controle (begin_cycle/end_cycle)
+        self.cycle_budget_ms = cycle_budget_ms
+        self._cycle_deadline = None
         
         try:
             # Configura UART para comunicação Modbus
-            self.uart = UART(uart_id, baudrate=baudrate, tx=Pin(tx_pin), rx=Pin(rx_pin))
-            self.uart.init(baudrate=baudrate, bits=8, parity=None, stop=1, timeout=int(timeout * 1000))
-            print(f"UART{uart_id} configurada: TX=GP{tx_pin}, RX=GP{rx_pin}, Baud={baudrate}")
+            self.uart = self._add_bus(uart_id, baudrate, tx_pin, rx_pin)
+            self.codec = self.codecs[0]
             self.fake_modbus = False
         except Exception as e:
             print(f"Erro ao configurar UART: {e}")
             print("Usando modo simulado (fake_modbus = True)")
+
+        if uart1_pins is not None and not self.fake_modbus:
+            try:
+                # Segundo barramento: as zonas em bus_map com valor 1 são lidas em paralelo na UART1
+                self._add_bus(1 - uart_id, baudrate, uart1_pins[0], uart1_pins[1])
+            except Exception as e:
+                print(f"Erro ao configurar segunda UART: {e}")
+                print("Todas as zonas ficam no barramento principal")
         
-        self.io_rpi = InOut()
+        self.io_rpi = InOut(modo=modo_saida, max_simultaneas=max_simultaneas, scheduler=scheduler)
+
+    def _add_bus(self, uart_id, baudrate, tx_pin, rx_pin):
+        uart = UART(uart_id, baudrate=baudrate, tx=Pin(tx_pin), rx=Pin(rx_pin))
+        uart.init(baudrate=baudrate, bits=8, parity=None, stop=1, timeout=int(self.timeout * 1000))
+        codec = ModbusRtuCodec(uart, baudrate=baudrate)
+        self.uarts.append(uart)
+        self.codecs.append(codec)
+        self.transacoes.append(ModbusTransaction(codec))
+        print(f"UART{uart_id} configurada: TX=GP{tx_pin}, RX=GP{rx_pin}, Baud={baudrate}")
+        return uart
+
+    def _bus(self, adr):
+        """Índice do barramento em que está o escravo"""
+        bus = self.bus_map.get(adr, 0)
+        return bus if bus < len(self.codecs) else 0
 
     def crc16_modbus(self, data):
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if (crc & 0x0001):
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        return crc
+        # CRC por tabela (Controller/Modbus_pico.py), mantido aqui por compatibilidade
+        return crc16_modbus(data)
+
+    def _get_rtt(self, adr):
+        est = self.rtt.get(adr)
+        if est is None:
+            timeout_ms = int(self.timeout * 1000)
+            est = RttEstimator(timeout_ms, min_ms=self.min_timeout_ms, max_ms=timeout_ms)
+            self.rtt[adr] = est
+        return est
+
+    def _get_health(self, adr):
+        health = self.health.get(adr)
+        if health is None:
+            health = SlaveHealth(adr)
+            self.health[adr] = health
+        return health
+
+    def _circuito_aberto(self, adr):
+        return self._get_health(adr).state in (HEALTH_OPEN, HEALTH_HALF_OPEN)
+
+    def peek_bus(self, adr):
+        """(estado, falhas, rtt_ms, timeout_ms) do escravo sem criar registros: seguro a partir de outro core"""
+        health = self.health.get(adr)
+        est = self.rtt.get(adr)
+        state = health.state if health is not None else HEALTH_HEALTHY
+        failures = health.failures if health is not None else 0
+        if est is None:
+            return state, failures, 0, max(self.min_timeout_ms, int(self.timeout * 1000))
+        return state, failures, est.srtt_ms(), est.timeout_ms()
+
+    def get_bus_status(self, adrs=None):
+        """Saúde e RTT de cada escravo (para exibição/diagnóstico; só leitura)"""
+        if adrs is None:
+            adrs = list(self.health.keys())
+        status = {}
+        for adr in adrs:
+            state, failures, rtt_ms, timeout_ms = self.peek_bus(adr)
+            status[adr] = {
+                'state': HEALTH_NAMES[state],
+                'failures': failures,
+                'rtt_ms': rtt_ms,
+                'timeout_ms': timeout_ms
+            }
+        return status
+
+    def begin_cycle(self, budget_ms=None):
+        """Inicia um ciclo de varredura com tempo máximo de barramento"""
+        if budget_ms is None:
+            budget_ms = self.cycle_budget_ms
+        self._cycle_deadline = time.ticks_add(time.ticks_ms(), budget_ms)
+
+    def end_cycle(self):
+        self._cycle_deadline = None
+
+    def _setup_transacao(self, bus, frame, expected, record=None, health=None):
+        adr = frame[0]
+        if health is None:
+            health = self._get_health(adr)
+        return self.transacoes[bus].setup(frame, expected, self._get_rtt(adr), health,
+                                          self._cycle_deadline, record)
+
+    def _transacao(self, bus, frame, expected, record=None, health=None):
+        """Envia o frame e aguarda resposta válida; retorna bytes recebidos ou -1.
+
+        health, se informado, substitui o circuit breaker do escravo (ex.: SlaveHealth descartável).
+        """
+        t = self._setup_transacao(bus, frame, expected, record, health)
+        if t.run() == TX_DONE:
+            return t.n
+        return -1
 
-    def _get_adr_PTA(self):
+    def start_poll_device(self, adr):
+        """Inicia sem bloquear a leitura do mapa do escravo; avance com poll() na transação retornada"""
+        bus = self._bus(adr)
+        record = self._get_record(adr)
+        start, count, _ = self.poll_map
+        frame = self.codecs[bus].read_request(adr, FUNC_READ_HOLDING, start, count)
+        t = self._setup_transacao(bus, frame, 5 + 2 * count, record)
+        t.start()
+        return t
+
+    def scan(self, adrs, values, ticks=None, on_sample=None, zonas=None, count=None):
+        """Lê todos os escravos intercalando transações nos barramentos; resultados em values/ticks.
+
+        ticks[i] recebe o ticks_ms da recepção do frame e só é atualizado em leituras válidas.
+        on_sample(i), se informado, é chamado assim que a transação da zona i termina (com ou sem resposta).
+        zonas, se informado, lista os índices a ler nesta varredura, na ordem de prioridade; count
+        limita a leitura aos primeiros count índices de zonas (buffer preenchido pelo chamador).
+        """
+        self.scan_start(adrs, values, ticks, on_sample, zonas, count)
+        while self.scan_poll():
+            pass
+
+    def scan_start(self, adrs, values, ticks=None, on_sample=None, zonas=None, count=None):
+        """Inicia uma varredura sem bloquear; avance com scan_poll() até retornar False"""
+        if zonas is None:
+            count = len(adrs)
+        elif count is None:
+            count = len(zonas)
+        if self.fake_modbus:
+            for j in range(count):
+                i = zonas[j] if zonas is not None else j
+                values[i] = self.get_temperature_channel(adrs[i])
+                if ticks is not None:
+                    ticks[i] = time.ticks_ms()
+                if on_sample is not None:
+                    on_sample(i)
+            self._scan_ativo = False
+            return
+        if len(self._scan_zonas) < count:
+            self._scan_zonas = array('b', [0] * count)
+        ordem = self._scan_zonas
+        # Escravos com circuito aberto vão por último: a sondagem não tira tempo das zonas saudáveis
+        k = 0
+        for aberto in (False, True):
+            for j in range(count):
+                i = zonas[j] if zonas is not None else j
+                if self._circuito_aberto(adrs[i]) == aberto:
+                    ordem[k] = i
+                    k += 1
+        for b in range(len(self.transacoes)):
+            self._scan_next[b] = 0
+            self._scan_cur[b] = -1
+        self._scan_adrs = adrs
+        self._scan_values = values
+        self._scan_ticks = ticks
+        self._scan_on_sample = on_sample
+        self._scan_count = count
+        self._scan_ativo = True
+
+    def scan_poll(self):
+        """Avança as transações da varredura em andamento; retorna True enquanto houver pendências"""
+        if not self._scan_ativo:
+            return False
+        adrs = self._scan_adrs
+        values = self._scan_values
+        ticks = self._scan_ticks
+        on_sample = self._scan_on_sample
+        zonas = self._scan_zonas
+        count = self._scan_count
+        next_idx = self._scan_next
+        current = self._scan_cur
+        pending = False
+        for b in range(len(self.transacoes)):
+            t = self.transacoes[b]
+            i = current[b]
+            if i >= 0:
+                if t.poll() == TX_PENDING:
+                    pending = True
+                    continue
+                record = self.records[adrs[i]]
+                values[i] = record.temperatura if record.valid else -1
+                if ticks is not None and record.valid:
+                    ticks[i] = t.rx_tick
+                current[b] = -1
+                if on_sample is not None:
+                    on_sample(i)
+            # Próxima zona deste barramento
+            j = next_idx[b]
+            while j < count and self._bus(adrs[zonas[j]]) != b:
+                j += 1
+            next_idx[b] = j + 1
+            if j < count:
+                current[b] = zonas[j]
+                self.start_poll_device(adrs[zonas[j]])
+                pending = True
+        if not pending:
+            self._scan_ativo = False
+            self._scan_values = None
+            self._scan_ticks = None
+            self._scan_on_sample = None
+        return pending
+
+    def discover(self, first=1, last=247, timeout_ms=30):
+        """Varre a faixa de endereços em todos os barramentos ao mesmo tempo, com timeout curto.
+
+        Retorna uma lista de dicionários com endereço, barramento, RTT e registradores lidos.
+        """
+        found = []
+        if self.fake_modbus:
+            return found
+        start, count, _ = self.poll_map
+        nbus = len(self.transacoes)
+        next_adr = [first] * nbus
+        current = [None] * nbus  # (endereço, estimador, registro) em andamento por barramento
+        for t in self.transacoes:
+            t.verbose = False
+        try:
+            active = True
+            while active:
+                active = False
+                for b in range(nbus):
+                    t = self.transacoes[b]
+                    if current[b] is not None:
+                        if t.poll() == TX_PENDING:
+                            active = True
+                            continue
+                        adr, est, record = current[b]
+                        current[b] = None
+                        if t.state == TX_DONE:
+                            rtt_ms = est.srtt_us() / 1000
+                            regs = {}
+                            for name, _, _ in self.poll_map[2]:
+                                regs[name] = getattr(record, name)
+                            found.append({'adr': adr, 'bus': b, 'rtt_ms': rtt_ms, 'regs': regs})
+                            # Aproveita a medida para iniciar o timeout adaptativo do escravo
+                            self._get_rtt(adr).sample(est.srtt_us())
+                            print(f"Escravo {adr} (barramento {b}): {rtt_ms:.1f} ms {regs}")
+                    if next_adr[b] <= last:
+                        adr = next_adr[b]
+                        next_adr[b] += 1
+                        # Estimador e saúde descartáveis: uma tentativa só, sem afetar o estado das zonas
+                        est = RttEstimator(timeout_ms, min_ms=timeout_ms, max_ms=timeout_ms,
+                                           max_wait_ms=timeout_ms)
+                        record = DeviceRecord(adr, self.poll_map)
+                        frame = self.codecs[b].scratch_request(adr, FUNC_READ_HOLDING, start, count)
+                        t.setup(frame, 5 + 2 * count, est, SlaveHealth(adr), None, record).start()
+                        current[b] = (adr, est, record)
+                        active = True
+        finally:
+            for t in self.transacoes:
+                t.verbose = True
+        return found
+
+    def commission(self, adrs, wait_device=None):
+        """Endereça em sequência os sensores de uma lista de zonas.
+
+        Para cada endereço chama wait_device(adr), que deve aguardar o operador ligar apenas o
+        sensor daquela zona; o sensor é endereçado e a leitura no endereço novo é verificada.
+        Retorna um dicionário endereço -> True/False.
+        """
+        result = {}
+        for adr in adrs:
+            if wait_device is not None:
+                wait_device(adr)
+            ok = False
+            bus = self._bus(adr)
+            atual = self._get_adr_PTA(bus)
+            if atual == adr or (atual != -1 and self.config_adr_PTA(adr, atual)):
+                # Confirma lendo o mapa completo no endereço novo (esquece falhas antigas da zona)
+                self.health.pop(adr, None)
+                ok = self.poll_device(adr).valid
+            result[adr] = ok
+            print(f"Zona {adr}: {'OK' if ok else 'FALHOU'}")
+        return result
+
+    def _get_adr_PTA(self, bus=0):
         if self.fake_modbus:
             return 1  # Retorna endereço padrão em modo simulado
 
+        # Saúde descartável: leituras sem sensor ligado não abrem o circuito do endereço de broadcast
         broadcast = 0xFF
-        id_loc = "{:02x}".format(broadcast).upper()
-
-        hex_text = "{}0300020001".format(id_loc)
-        bytes_hex = bytes.fromhex(hex_text)
-        crc_result = self.crc16_modbus(bytes_hex)
-
-        parte_superior = (crc_result >> 8) & 0xFF
-        parte_inferior = crc_result & 0xFF
-
-        for i in range(3):
-            try:
-                # Envia comando Modbus
-                cmd = bytes([broadcast, 3, 0, 2, 0, 1, parte_inferior, parte_superior])
-                self.uart.write(cmd)
-                
-                # Aguarda resposta
-                start_time = time.ticks_ms()
-                while self.uart.any() == 0:
-                    if time.ticks_diff(time.ticks_ms(), start_time) > self.timeout * 1000:
-                        print("Timeout: Nenhuma resposta do escravo.")
-                        break
-                    time.sleep_ms(10)
-
-                if self.uart.any() > 0:
-                    dados_recebidos = self.uart.read(7)
-                    if dados_recebidos and len(dados_recebidos) == 7:
-                        # Processa dados recebidos
-                        dados_hex = dados_recebidos.hex()
-                        hex_text = dados_hex[0:10]
-                        bytes_hex = bytes.fromhex(hex_text)
-                        crc_result = self.crc16_modbus(bytes_hex)
-
-                        parte_superior = (crc_result >> 8) & 0xFF
-                        parte_inferior = crc_result & 0xFF
-
-                        superior_crc = int(dados_hex[12:14], 16)
-                        inferior_crc = int(dados_hex[10:12], 16)
-
-                        if superior_crc == parte_superior and inferior_crc == parte_inferior:
-                            endereco = int(dados_hex[6:10], 16)
-                            return endereco
-                        else:
-                            print("CRC inválido")
-                    
-            except Exception as e:
-                print(f"Erro de comunicação: {e}")
-                return -1
+        frame = self.codecs[bus].read_request(broadcast, FUNC_READ_HOLDING, 0x0002, 1)
+        if self._transacao(bus, frame, 7, health=SlaveHealth(broadcast)) > 0:
+            return self.codecs[bus].u16(3)
         return -1
 
-    def config_adr_PTA(self, adr):
+    def config_adr_PTA(self, adr, adr_device=None):
         if self.fake_modbus:
             return True  # Simula sucesso em modo simulado
 
-        adr_target = "{:04x}".format(adr).upper()
-        adr_device = self._get_adr_PTA()
+        # O dispositivo novo deve estar ligado no barramento da zona que vai receber o endereço
+        bus = self._bus(adr)
+        if adr_device is None:
+            adr_device = self._get_adr_PTA(bus)
 
         if adr_device == -1:
             return False
 
-        id_device = "{:02x}".format(adr_device).upper()
-        hex_text = "{}060002{}".format(id_device, adr_target)
-        bytes_hex = bytes.fromhex(hex_text)
-        crc_result = self.crc16_modbus(bytes_hex)
-
-        parte_superior = (crc_result >> 8) & 0xFF
-        parte_inferior = crc_result & 0xFF
-
-        adr_target_int = int(adr_target, 16)
-        msb = (adr_target_int >> 8) & 0xFF
-        lsb = adr_target_int & 0xFF
-
-        for i in range(3):
-            try:
-                cmd = bytes([adr_device, 6, 0, 2, msb, lsb, parte_inferior, parte_superior])
-                self.uart.write(cmd)
-
-                start_time = time.ticks_ms()
-                while self.uart.any() == 0:
-                    if time.ticks_diff(time.ticks_ms(), start_time) > self.timeout * 1000:
-                        print("Timeout: Nenhuma resposta do escravo.")
-                        break
-                    time.sleep_ms(10)
-
-                if self.uart.any() > 0:
-                    dados_recebidos = self.uart.read(8)
-                    if dados_recebidos and len(dados_recebidos) == 8:
-                        # Verifica resposta
-                        return True
-                    
-            except Exception as e:
-                print(f"Erro de comunicação: {e}")
-                return False
-        return False
+        # Resposta da função 0x06 é o eco do próprio frame (8 bytes)
+        frame = self.codecs[bus].write_request(adr_device, 0x0002, adr & 0xFFFF)
+        return self._transacao(bus, frame, 8, health=SlaveHealth(adr_device)) > 0
+
+    def _read_registers(self, func, adr, start, count, bus=None):
+        """Lê 'count' registradores em uma transação; os dados ficam no buffer de RX do codec"""
+        if bus is None:
+            bus = self._bus(adr)
+        frame = self.codecs[bus].read_request(adr, func, start, count)
+        return self._transacao(bus, frame, 5 + 2 * count) > 0
+
+    def read_holding_registers(self, adr, start, count):
+        """Função 0x03: retorna lista com os registradores ou None em caso de falha"""
+        if self.fake_modbus or not self._read_registers(FUNC_READ_HOLDING, adr, start, count):
+            return None
+        codec = self.codecs[self._bus(adr)]
+        return [codec.u16(3 + 2 * i) for i in range(count)]
+
+    def read_input_registers(self, adr, start, count):
+        """Função 0x04: retorna lista com os registradores ou None em caso de falha"""
+        if self.fake_modbus or not self._read_registers(FUNC_READ_INPUT, adr, start, count):
+            return None
+        codec = self.codecs[self._bus(adr)]
+        return [codec.u16(3 + 2 * i) for i in range(count)]
+
+    def _get_record(self, adr):
+        record = self.records.get(adr)
+        if record is None:
+            record = DeviceRecord(adr, self.poll_map)
+            self.records[adr] = record
+        record.valid = False
+        return record
+
+    def poll_device(self, adr):
+        """Lê todo o mapa do escravo em uma única transação e atualiza seu DeviceRecord"""
+        bus = self._bus(adr)
+        record = self._get_record(adr)
+        start, count, _ = self.poll_map
+        frame = self.codecs[bus].read_request(adr, FUNC_READ_HOLDING, start, count)
+        self._transacao(bus, frame, 5 + 2 * count, record)
+        return record
 
     def get_temperature_channel(self, adr):
         if self.fake_modbus:
@@ -257,60 +874,18 @@ class IO_MODBUS:
             import urandom
             return 20.0 + urandom.randint(0, 100)  # Temperatura simulada entre 20-120°C
 
-        # Converte endereço para hex de forma compatível com MicroPython
-        id_device = "{:02x}".format(adr).upper()
-        hex_text = "{}0300000001".format(id_device)
-        bytes_hex = bytes.fromhex(hex_text)
-        crc_result = self.crc16_modbus(bytes_hex)
-
-        parte_superior = (crc_result >> 8) & 0xFF
-        parte_inferior = crc_result & 0xFF
-
-        for i in range(3):
-            try:
-                cmd = bytes([adr, 3, 0, 0, 0, 1, parte_inferior, parte_superior])
-                self.uart.write(cmd)
-
-                start_time = time.ticks_ms()
-                while self.uart.any() == 0:
-                    if time.ticks_diff(time.ticks_ms(), start_time) > self.timeout * 1000:
-                        print("Timeout: Nenhuma resposta do escravo.")
-                        break
-                    time.sleep_ms(10)
-
-                if self.uart.any() > 0:
-                    dados_recebidos = self.uart.read(7)
-                    if dados_recebidos and len(dados_recebidos) == 7:
-                        # Processa temperatura
-                        dados_hex = dados_recebidos.hex()
-                        hex_text = dados_hex[0:10]
-                        bytes_hex = bytes.fromhex(hex_text)
-                        crc_result = self.crc16_modbus(bytes_hex)
-
-                        parte_superior = (crc_result >> 8) & 0xFF
-                        parte_inferior = crc_result & 0xFF
-
-                        superior_crc = int(dados_hex[12:14], 16)
-                        inferior_crc = int(dados_hex[10:12], 16)
-
-                        if superior_crc == parte_superior and inferior_crc == parte_inferior:
-                            temperatura_hex = dados_hex[6:10]
-                            temperatura = int(temperatura_hex, 16) / 10.0  # Converte para °C
-                            return temperatura
-                        else:
-                            print("CRC inválido")
-                    
-            except Exception as e:
-                print(f"Erro de comunicação: {e}")
-                return -1
+        record = self.poll_device(adr)
+        if record.valid:
+            return record.temperatura  # Já convertida para °C pelo mapa de leitura
         return -1
 
     def reset_serial(self):
         try:
-            if hasattr(self, 'uart') and self.uart:
-                self.uart.deinit()
+            for uart in self.uarts:
+                uart.deinit()
                 time.sleep_ms(500)
-                self.uart.init()
+                uart.init()
+            if self.uarts:
                 print("UART resetada com sucesso.")
         except Exception as e:
             print(f"Erro ao resetar UART: {e}")
@@ -324,13 +899,15 @@ if __name__ == '__main__':
         print("1. Visualizar endereço do dispositivo")
         print("2. Modificar endereço do dispositivo")
         print("3. Ler temperatura")
-        print("4. Sair")
+        print("4. Descobrir dispositivos no barramento")
+        print("5. Comissionar endereços das zonas")
+        print("6. Sair")
         
         try:
             opcao = input("Escolha uma opção: ")
         except:
             # No MicroPython, input() pode não estar disponível
-            opcao = '4'  # Sai automaticamente
+            opcao = '6'  # Sai automaticamente
 
         if opcao == '1':
             endereco = io._get_adr_PTA()
@@ -359,6 +936,15 @@ if __name__ == '__main__':
             except:
                 print("Entrada inválida.")
         elif opcao == '4':
+            dispositivos = io.discover()
+            print(f"{len(dispositivos)} dispositivo(s) encontrado(s).")
+        elif opcao == '5':
+            try:
+                zonas = [int(z) for z in input("Endereços das zonas (ex.: 1,2,3,4,5,6): ").split(",")]
+                io.commission(zonas, lambda adr: input(f"Ligue apenas o sensor da zona {adr} e pressione Enter"))
+            except:
+                print("Entrada inválida.")
+        elif opcao == '6':
             break
         else:
             print("Opção inválida. Tente novamente.")
\ No newline at end of file
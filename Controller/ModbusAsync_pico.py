@@ -0,0 +1,131 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from Controller.Modbus_pico import (ModbusRtuCodec, DeviceRecord, PTA_POLL_MAP,
+                                    FUNC_READ_HOLDING, FUNC_READ_INPUT)
+
+
+class AsyncModbusClient:
+    """Cliente Modbus RTU assíncrono sobre a UART (StreamReader/StreamWriter do uasyncio)"""
+    def __init__(self, uart, baudrate=9600, timeout_ms=300, retries=3, poll_map=PTA_POLL_MAP):
+        self.uart = uart
+        self.codec = ModbusRtuCodec(uart, baudrate=baudrate)
+        self.reader = asyncio.StreamReader(uart)
+        self.writer = asyncio.StreamWriter(uart, {})
+        # O Lock do uasyncio atende as tarefas em ordem de chegada: funciona como fila de requisições
+        self._lock = asyncio.Lock()
+        self.timeout_ms = timeout_ms
+        self.retries = retries
+        self.poll_map = poll_map
+        self.records = {}  # endereço -> DeviceRecord
+
+    @classmethod
+    def from_io(cls, io_modbus, **kwargs):
+        """Cria o cliente sobre a UART já configurada por um IO_MODBUS (não usar os dois ao mesmo tempo)"""
+        baudrate = io_modbus.codec.baudrate if io_modbus.codec is not None else 9600
+        return cls(io_modbus.uart, baudrate=baudrate, poll_map=io_modbus.poll_map, **kwargs)
+
+    async def _recv_frame(self):
+        """Lê um frame completo do stream usando o cabeçalho para saber o tamanho"""
+        codec = self.codec
+        codec.feed(await self.reader.readexactly(3))
+        func = codec.u8(1)
+        if func & 0x80:
+            rest = 2                   # Exceção: só falta o CRC
+        elif func == FUNC_READ_HOLDING or func == FUNC_READ_INPUT:
+            rest = codec.u8(2) + 2     # Dados + CRC
+        else:
+            rest = 5                   # Eco de escrita (0x05/0x06/0x0F/0x10)
+        codec.feed(await self.reader.readexactly(rest))
+
+    async def _request(self, frame, expected, timeout_ms=None):
+        """Executa uma transação (chamar com o lock adquirido); retorna bytes recebidos ou -1"""
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+        codec = self.codec
+        for i in range(self.retries):
+            codec.flush_rx()
+            self.writer.write(frame)
+            await self.writer.drain()
+            try:
+                await asyncio.wait_for(self._recv_frame(), timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                print("Timeout: Nenhuma resposta do escravo.")
+                continue
+            n = codec.rx_len
+            if not codec.check_crc(n):
+                print("CRC inválido")
+            elif (frame[0] != 0xFF and codec.u8(0) != frame[0]) or (codec.u8(1) & 0x7F) != frame[1]:
+                print("Resposta de outro escravo ou função")  # Resposta atrasada de uma transação anterior
+            elif codec.exception_code(n):
+                print(f"Exceção Modbus: {codec.exception_code(n)}")
+                return -1
+            elif n == expected:
+                return n
+        return -1
+
+    async def read_registers(self, adr, start, count, func=FUNC_READ_HOLDING, timeout_ms=None):
+        """Lê 'count' registradores (0x03 ou 0x04); retorna lista ou None"""
+        # Frames e buffer de RX do codec são compartilhados: monta, envia e decodifica com o lock
+        async with self._lock:
+            frame = self.codec.read_request(adr, func, start, count)
+            if await self._request(frame, 5 + 2 * count, timeout_ms) < 0:
+                return None
+            return [self.codec.u16(3 + 2 * i) for i in range(count)]
+
+    async def write_register(self, adr, reg, value, timeout_ms=None):
+        """Escreve um registrador (0x06); retorna True se o escravo confirmou"""
+        async with self._lock:
+            frame = self.codec.write_request(adr, reg, value & 0xFFFF)
+            return await self._request(frame, 8, timeout_ms) > 0
+
+    async def poll_device(self, adr, timeout_ms=None):
+        """Lê o mapa completo do escravo em uma transação e atualiza seu DeviceRecord"""
+        record = self.records.get(adr)
+        if record is None:
+            record = DeviceRecord(adr, self.poll_map)
+            self.records[adr] = record
+        start, count, _ = self.poll_map
+        async with self._lock:
+            frame = self.codec.read_request(adr, FUNC_READ_HOLDING, start, count)
+            if await self._request(frame, 5 + 2 * count, timeout_ms) > 0:
+                record.decode(self.codec)
+            else:
+                record.valid = False
+        return record
+
+    async def get_temperature_channel(self, adr, timeout_ms=None):
+        """Equivalente assíncrono de IO_MODBUS.get_temperature_channel (retorna -1 em falha)"""
+        record = await self.poll_device(adr, timeout_ms)
+        if record.valid:
+            return record.temperatura
+        return -1
+
+
+# Exemplo de uso: leitura concorrente com outra tarefa rodando no mesmo core
+if __name__ == "__main__":
+    from machine import UART, Pin
+
+    async def leitura(client, enderecos):
+        while True:
+            temps = []
+            for adr in enderecos:
+                temps.append(await client.get_temperature_channel(adr))
+            print(f"Temperaturas: {temps}")
+            await asyncio.sleep_ms(500)
+
+    async def pisca():
+        led = Pin("LED", Pin.OUT)
+        while True:
+            led.toggle()
+            await asyncio.sleep_ms(250)
+
+    async def main():
+        uart = UART(0, baudrate=9600, tx=Pin(0), rx=Pin(1))
+        client = AsyncModbusClient(uart)
+        asyncio.create_task(pisca())
+        await leitura(client, [1, 2, 3, 4, 5, 6])
+
+    asyncio.run(main())
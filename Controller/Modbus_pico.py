@@ -0,0 +1,455 @@
+import time
+import struct
+from array import array
+
+try:
+    import micropython
+except ImportError:
+    micropython = None  # CPython / host: usa apenas o caminho em Python puro
+
+
+# Tabela CRC-16/Modbus (polinômio refletido 0xA001), gerada uma única vez na importação
+def _build_crc_table():
+    table = array('H', [0] * 256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        table[i] = crc
+    return table
+
+_CRC_TABLE = _build_crc_table()
+
+
+def _crc16_update_py(crc, buf, start, end):
+    """Atualiza o CRC sobre buf[start:end] sem copiar o buffer (Python puro)"""
+    table = _CRC_TABLE
+    for i in range(start, end):
+        crc = (crc >> 8) ^ table[(crc ^ buf[i]) & 0xFF]
+    return crc
+
+
+# crc16_update(crc, buf, start, end): API incremental (permite CRC de um trecho do buffer)
+crc16_update = _crc16_update_py
+
+if micropython is not None:
+    # Caminho rápido no RP2040/RP2350: viper acessa tabela e buffer por ponteiro
+    @micropython.viper
+    def _crc16_update_viper(crc: int, buf, start: int, end: int) -> int:
+        table = ptr16(_CRC_TABLE)
+        data = ptr8(buf)
+        i = start
+        while i < end:
+            crc = (crc >> 8) ^ table[(crc ^ data[i]) & 0xFF]
+            i += 1
+        return crc
+
+    crc16_update = _crc16_update_viper
+
+
+def crc16_modbus(data):
+    """CRC-16/Modbus de um frame completo"""
+    return crc16_update(0xFFFF, data, 0, len(data))
+
+
+# Funções Modbus usadas
+FUNC_READ_HOLDING = 0x03
+FUNC_READ_INPUT = 0x04
+FUNC_WRITE_SINGLE = 0x06
+
+# Mapa de leitura do sensor PTA: (registrador inicial, quantidade, campos)
+# Cada campo é (nome, offset no bloco, divisor); tudo vem em uma única transação 0x03.
+# Só o registrador 0 é conhecido; outros campos (ex.: status) entram via IO_MODBUS(poll_map=...)
+# depois de conferidos no equipamento - um bloco fora do mapa do PTA derruba a leitura da temperatura.
+PTA_POLL_MAP = (0x0000, 1, (
+    ('temperatura', 0, 10),   # Registrador 0: temperatura em décimos de °C
+))
+
+
+class DeviceRecord:
+    """Registro tipado com os últimos valores lidos de um escravo segundo seu mapa de leitura"""
+    def __init__(self, adr, poll_map=PTA_POLL_MAP):
+        self.adr = adr
+        self.poll_map = poll_map
+        self.valid = False
+        for name, _, _ in poll_map[2]:
+            setattr(self, name, 0)
+
+    def decode(self, codec):
+        """Atualiza os campos a partir da resposta que está no buffer de RX do codec"""
+        for name, offset, divisor in self.poll_map[2]:
+            raw = codec.u16(3 + 2 * offset)
+            setattr(self, name, raw / divisor if divisor != 1 else raw)
+        self.valid = True
+
+
+class RttEstimator:
+    """RTT de um escravo (EWMA de média e desvio, como o RTO do TCP) em microssegundos inteiros"""
+    def __init__(self, initial_ms, min_ms=30, max_ms=1000, max_wait_ms=300):
+        self.min_us = min_ms * 1000
+        self.max_us = max_ms * 1000
+        self.max_wait_us = max_wait_ms * 1000  # Espera total aceitável por leitura, somando tentativas
+        self.srtt8 = 0     # RTT suavizado x8
+        self.rttvar4 = 0   # Desvio médio x4
+        self.samples = 0
+        self.rto_us = max(self.min_us, min(self.max_us, initial_ms * 1000))
+
+    def sample(self, rtt_us):
+        """Registra o tempo de uma transação bem-sucedida e recalcula o timeout"""
+        if self.samples == 0:
+            self.srtt8 = rtt_us << 3
+            self.rttvar4 = rtt_us << 1
+        else:
+            delta = rtt_us - (self.srtt8 >> 3)
+            self.srtt8 += delta
+            if delta < 0:
+                delta = -delta
+            self.rttvar4 += delta - (self.rttvar4 >> 2)
+        self.samples += 1
+        rto = (self.srtt8 >> 3) + self.rttvar4
+        self.rto_us = max(self.min_us, min(self.max_us, rto))
+
+    def backoff(self):
+        """Timeout sem resposta: dobra o timeout até o máximo"""
+        self.rto_us = min(self.max_us, self.rto_us << 1)
+
+    def timeout_ms(self):
+        return self.rto_us // 1000
+
+    def probe_timeout_ms(self):
+        """Timeout curto da sondagem de um escravo com circuito aberto (2x o RTT já medido, no mínimo min_ms)"""
+        if self.samples == 0:
+            return self.rto_us // 1000  # Nunca respondeu: sem RTT medido, usa o timeout corrente
+        return min(self.max_us, max(self.min_us, (self.srtt8 >> 3) * 2)) // 1000
+
+    def attempts(self):
+        """Quantas tentativas cabem na espera máxima com o timeout atual (1 a 3)"""
+        return max(1, min(3, self.max_wait_us // self.rto_us))
+
+    def srtt_ms(self):
+        return (self.srtt8 >> 3) // 1000
+
+    def srtt_us(self):
+        return self.srtt8 >> 3
+
+
+# Estados de saúde de um escravo
+HEALTH_HEALTHY = 0
+HEALTH_SUSPECT = 1
+HEALTH_OPEN = 2
+HEALTH_HALF_OPEN = 3
+HEALTH_NAMES = ('healthy', 'suspect', 'open', 'half_open')
+
+
+class SlaveHealth:
+    """Circuit breaker de um escravo: falhas seguidas abrem o circuito e ele passa a ser sondado com back-off"""
+    def __init__(self, adr, open_after=3, backoff_ms=2000, max_backoff_ms=60000):
+        self.adr = adr
+        self.state = HEALTH_HEALTHY
+        self.failures = 0
+        self.open_after = open_after
+        self.base_backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.backoff_ms = backoff_ms
+        self.next_probe = 0
+
+    def allow(self, now):
+        """Indica se pode usar o barramento com este escravo agora"""
+        if self.state != HEALTH_OPEN:
+            return True
+        if time.ticks_diff(now, self.next_probe) >= 0:
+            self.state = HEALTH_HALF_OPEN  # Uma sondagem; o resultado decide o próximo estado
+            return True
+        return False
+
+    def success(self):
+        if self.state == HEALTH_HALF_OPEN or self.state == HEALTH_OPEN:
+            print(f"Escravo {self.adr}: respondeu, circuito fechado")
+        self.state = HEALTH_HEALTHY
+        self.failures = 0
+        self.backoff_ms = self.base_backoff_ms
+
+    def failure(self, now):
+        self.failures += 1
+        if self.state == HEALTH_HALF_OPEN:
+            self.backoff_ms = min(self.max_backoff_ms, self.backoff_ms * 2)
+        elif self.failures < self.open_after:
+            self.state = HEALTH_SUSPECT
+            return
+        self.state = HEALTH_OPEN
+        self.next_probe = time.ticks_add(now, self.backoff_ms)
+        print(f"Escravo {self.adr}: circuito aberto, nova sondagem em {self.backoff_ms} ms")
+
+    def state_name(self):
+        return HEALTH_NAMES[self.state]
+
+
+# Estados do receptor
+RX_PENDING = 0
+RX_DONE = 1
+RX_TIMEOUT = 2
+
+
+class ModbusRtuCodec:
+    """Monta e decodifica frames Modbus RTU usando buffers pré-alocados (sem alocação no regime)"""
+    def __init__(self, uart, baudrate=9600, rx_size=64):
+        self.uart = uart
+        self.baudrate = baudrate
+        self._tx = bytearray(8)
+        self._rx = bytearray(rx_size)
+        self._rx_mv = memoryview(self._rx)
+        self._byte = bytearray(1)
+        # Frames de leitura constantes, um por escravo/função: chave (func << 8) | adr
+        self._frames = {}
+
+        # Tempo de caractere (11 bits no RTU) e silêncio de 3,5 caracteres que delimita o frame
+        self.char_us = 11000000 // baudrate
+        self.t35_us = 1750 if baudrate > 19200 else (self.char_us * 35) // 10
+
+        self.rx_len = 0
+        self._rx_start = 0
+        self._rx_last = 0
+        self._rx_timeout_us = 0
+
+    @staticmethod
+    def _build(buf, adr, func, reg, value):
+        struct.pack_into('>BBHH', buf, 0, adr, func, reg, value)
+        crc = crc16_update(0xFFFF, buf, 0, 6)
+        buf[6] = crc & 0xFF          # CRC vai no frame com o byte baixo primeiro
+        buf[7] = (crc >> 8) & 0xFF
+        return buf
+
+    def read_request(self, adr, func, reg, count):
+        """Retorna o frame de leitura em cache para o escravo (gera apenas na primeira vez)"""
+        key = (func << 8) | adr
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = bytearray(8)
+            self._frames[key] = frame
+        elif (frame[2] << 8 | frame[3]) == reg and (frame[4] << 8 | frame[5]) == count:
+            return frame
+        return self._build(frame, adr, func, reg, count)
+
+    def scratch_request(self, adr, func, reg, value):
+        """Monta um frame avulso (não guardado em cache) no buffer de TX"""
+        return self._build(self._tx, adr, func, reg, value)
+
+    def write_request(self, adr, reg, value):
+        """Monta um frame de escrita de registrador único (função 0x06) no buffer de TX"""
+        return self._build(self._tx, adr, FUNC_WRITE_SINGLE, reg, value)
+
+    def flush_rx(self):
+        """Descarta bytes atrasados de uma transação anterior"""
+        while self.uart.any():
+            self.uart.readinto(self._rx_mv)
+        self.rx_len = 0
+
+    def send(self, frame):
+        self.flush_rx()
+        self.uart.write(frame)
+
+    def feed(self, data):
+        """Acrescenta ao buffer de RX bytes recebidos por outro caminho (ex.: stream assíncrono)"""
+        n = self.rx_len
+        k = min(len(data), len(self._rx) - n)
+        self._rx[n:n + k] = data[:k]
+        self.rx_len = n + k
+        return k
+
+    def rx_start(self, timeout_ms):
+        """Prepara o receptor para um novo frame (chamar logo após send)"""
+        self.rx_len = 0
+        self._rx_start = time.ticks_us()
+        self._rx_last = self._rx_start
+        self._rx_timeout_us = int(timeout_ms * 1000)
+
+    def _frame_complete(self):
+        """Verifica pelo cabeçalho se o frame já chegou inteiro"""
+        n = self.rx_len
+        if n < 2:
+            return False
+        func = self._rx[1]
+        if func & 0x80:
+            return n >= 5  # Resposta de exceção: adr, func|0x80, código, CRC
+        if func == 0x03 or func == 0x04:
+            return n >= 3 and n >= self._rx[2] + 5
+        if func == 0x05 or func == 0x06 or func == 0x0F or func == 0x10:
+            return n >= 8
+        return False  # Função desconhecida: depende do silêncio de 3,5 caracteres
+
+    def rx_poll(self):
+        """Consome os bytes disponíveis sem bloquear; retorna RX_PENDING, RX_DONE ou RX_TIMEOUT"""
+        now = time.ticks_us()
+        if self.uart.any():
+            rx = self._rx
+            size = len(rx)
+            while self.uart.any() and self.rx_len < size:
+                self.uart.readinto(self._byte, 1)
+                rx[self.rx_len] = self._byte[0]
+                self.rx_len += 1
+            self._rx_last = now
+            if self._frame_complete() or self.rx_len >= size:
+                return RX_DONE
+        elif self.rx_len == 0:
+            if time.ticks_diff(now, self._rx_start) > self._rx_timeout_us:
+                return RX_TIMEOUT
+        elif time.ticks_diff(now, self._rx_last) >= self.t35_us:
+            return RX_DONE  # Silêncio na linha: fim do frame
+        return RX_PENDING
+
+    def check_crc(self, n):
+        """Valida o CRC dos 'n' bytes recebidos"""
+        if n < 4:
+            return False
+        crc = crc16_update(0xFFFF, self._rx, 0, n - 2)
+        return crc == (self._rx[n - 2] | (self._rx[n - 1] << 8))
+
+    def exception_code(self, n):
+        """Código de exceção Modbus da resposta (0 se não for uma exceção)"""
+        if n >= 5 and self._rx[1] & 0x80:
+            return self._rx[2]
+        return 0
+
+    def u8(self, offset):
+        """Byte do buffer de RX"""
+        return self._rx[offset]
+
+    def u16(self, offset):
+        """Registrador de 16 bits (big-endian) do buffer de RX"""
+        return (self._rx[offset] << 8) | self._rx[offset + 1]
+
+
+# Estados de uma transação não bloqueante
+TX_IDLE = 0
+TX_PENDING = 1
+TX_DONE = 2
+TX_ERROR = 3
+
+
+class ModbusTransaction:
+    """Transação Modbus não bloqueante: start() envia, poll() avança recepção, validação e tentativas"""
+    def __init__(self, codec):
+        self.codec = codec
+        self.state = TX_IDLE
+        self.frame = None
+        self.expected = 0
+        self.rtt = None
+        self.health = None
+        self.record = None
+        self.deadline = None
+        self.attempts_left = 0
+        self.n = 0
+        self.exception = 0
+        self.rx_tick = 0  # ticks_ms em que o frame válido foi recebido
+        self.verbose = True  # False silencia timeouts/CRC (ex.: varredura de endereços)
+        self._start_us = 0
+        self._probe = False  # Sondagem de circuito meio-aberto: uma tentativa com timeout curto
+
+    def setup(self, frame, expected, rtt, health, deadline=None, record=None):
+        """Configura a próxima transação (o objeto é reaproveitado, sem alocação)"""
+        self.frame = frame
+        self.expected = expected
+        self.rtt = rtt
+        self.health = health
+        self.deadline = deadline
+        self.record = record
+        self.state = TX_IDLE
+        return self
+
+    def start(self):
+        if not self.health.allow(time.ticks_ms()):
+            self.state = TX_ERROR  # Circuito aberto: escravo em back-off, não ocupa o barramento
+            return self.state
+        self._probe = self.health.state == HEALTH_HALF_OPEN
+        self.attempts_left = 1 if self._probe else self.rtt.attempts()
+        self.n = 0
+        self.exception = 0
+        return self._send()
+
+    def _send(self):
+        timeout_ms = self.rtt.probe_timeout_ms() if self._probe else self.rtt.timeout_ms()
+        if self.deadline is not None:
+            remaining = time.ticks_diff(self.deadline, time.ticks_ms())
+            if remaining <= 0:
+                self.state = TX_ERROR  # Orçamento do ciclo esgotado: não ocupa mais o barramento
+                return self.state
+            timeout_ms = min(timeout_ms, remaining)
+        try:
+            self._start_us = time.ticks_us()
+            self.codec.send(self.frame)
+            self.codec.rx_start(timeout_ms)
+        except Exception as e:
+            print(f"Erro de comunicação: {e}")
+            return self._fail()
+        self.attempts_left -= 1
+        self.state = TX_PENDING
+        return self.state
+
+    def _retry(self):
+        if self.attempts_left > 0:
+            return self._send()
+        return self._fail()
+
+    def _fail(self):
+        self.health.failure(time.ticks_ms())
+        self.state = TX_ERROR
+        return self.state
+
+    def poll(self):
+        """Avança a transação sem bloquear; retorna TX_PENDING, TX_DONE ou TX_ERROR"""
+        if self.state != TX_PENDING:
+            return self.state
+        codec = self.codec
+        try:
+            rx = codec.rx_poll()
+        except Exception as e:
+            print(f"Erro de comunicação: {e}")
+            return self._fail()
+        if rx == RX_PENDING:
+            return TX_PENDING
+        if rx == RX_TIMEOUT:
+            if not self._probe:
+                self.rtt.backoff()  # Escravo mudo em sondagem não infla o timeout de quando voltar
+            if self.verbose:
+                print("Timeout: Nenhuma resposta do escravo.")
+            return self._retry()
+
+        n = codec.rx_len
+        if not codec.check_crc(n):
+            if self.verbose:
+                print("CRC inválido")
+            return self._retry()
+        frame = self.frame
+        if (frame[0] != 0xFF and codec.u8(0) != frame[0]) or (codec.u8(1) & 0x7F) != frame[1]:
+            if self.verbose:
+                print("Resposta de outro escravo ou função")  # Resposta atrasada de uma transação anterior
+            return self._retry()
+        self.exception = codec.exception_code(n)
+        if self.exception:
+            print(f"Exceção Modbus: {self.exception}")
+            self.health.success()
+            self.state = TX_ERROR  # O escravo respondeu, repetir não muda o resultado
+            return self.state
+        func = self.frame[1]
+        if n != self.expected or ((func == FUNC_READ_HOLDING or func == FUNC_READ_INPUT)
+                                  and codec.u8(2) != n - 5):
+            return self._retry()
+
+        self.rtt.sample(time.ticks_diff(time.ticks_us(), self._start_us))
+        self.health.success()
+        self.n = n
+        self.rx_tick = time.ticks_ms()
+        if self.record is not None:
+            self.record.decode(codec)
+        self.state = TX_DONE
+        return self.state
+
+    def run(self):
+        """Executa a transação até o fim (modo bloqueante)"""
+        state = self.start()
+        while state == TX_PENDING:
+            state = self.poll()
+        return state
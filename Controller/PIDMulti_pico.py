@@ -0,0 +1,264 @@
+from array import array
+
+try:
+    from time import ticks_diff
+except ImportError:
+    # CPython / host: timestamps são inteiros em ms sem wrap-around
+    def ticks_diff(a, b):
+        return a - b
+
+
+class MultiZonePID:
+    """PID de várias zonas com todo o estado em arrays contíguos (float32/int32).
+
+    compute_all() atualiza as zonas em uma passada, lendo medições e timestamps (ticks_ms)
+    de listas/arrays do chamador e escrevendo as saídas em um array também do chamador.
+    O dt vem dos timestamps das amostras; zona cujo timestamp não avançou é pulada.
+    """
+    def __init__(self, kp, ki, kd, setpoints, output_min=0, output_max=100,
+                 integral_min=-50, integral_max=50, now=0):
+        n = len(kp)
+        self.n = n
+        self.kp = array('f', kp)
+        self.ki = array('f', ki)
+        self.kd = array('f', kd)
+        self.setpoint = array('f', setpoints)
+        self.output_min = output_min
+        self.output_max = output_max
+        self.integral_min = array('f', [integral_min] * n)
+        self.integral_max = array('f', [integral_max] * n)
+
+        self.integral = array('f', [0] * n)
+        self.prev_error = array('f', [0] * n)
+        self.prev_time = array('i', [0] * n)
+        self.error = array('f', [0] * n)
+        self.integral_step = array('f', [0] * n)  # Parcela integrada no último passo (anti-windup externo)
+        self.reset(now)
+
+    def reset(self, now):
+        for i in range(self.n):
+            self.integral[i] = 0
+            self.prev_error[i] = 0
+            self.prev_time[i] = now
+            self.integral_step[i] = 0
+
+    def set_gains(self, kp=None, ki=None, kd=None):
+        for i in range(self.n):
+            if kp is not None:
+                self.kp[i] = kp[i]
+            if ki is not None:
+                self.ki[i] = ki[i]
+            if kd is not None:
+                self.kd[i] = kd[i]
+
+    def set_setpoints(self, setpoints):
+        for i in range(self.n):
+            self.setpoint[i] = setpoints[i]
+
+    def compute_all(self, measurements, timestamps, out, start=0, end=None):
+        """Calcula as zonas start..end-1; out[i] recebe a saída limitada da zona i"""
+        if end is None:
+            end = self.n
+        kp = self.kp
+        ki = self.ki
+        kd = self.kd
+        setpoint = self.setpoint
+        integral = self.integral
+        prev_error = self.prev_error
+        prev_time = self.prev_time
+        err_buf = self.error
+        step_buf = self.integral_step
+        i_min = self.integral_min
+        i_max = self.integral_max
+        o_min = self.output_min
+        o_max = self.output_max
+        for i in range(start, end):
+            now = timestamps[i]
+            dt = ticks_diff(now, prev_time[i]) / 1000.0
+            if dt <= 0:
+                continue  # Amostra repetida ou antiga: mantém a saída anterior
+
+            error = setpoint[i] - measurements[i]
+
+            # Termo integral com limite (anti-windup)
+            step = error * dt
+            acc = integral[i] + step
+            if acc < i_min[i]:
+                acc = i_min[i]
+            elif acc > i_max[i]:
+                acc = i_max[i]
+            step = acc - integral[i]  # Parcela efetivamente integrada (após o limite)
+
+            output = kp[i] * error + ki[i] * acc + kd[i] * (error - prev_error[i]) / dt
+
+            # Saída saturada no sentido do erro: mantém a integral de antes deste passo
+            if output > o_max:
+                if error > 0:
+                    acc = integral[i]
+                    step = 0
+                output = o_max
+            elif output < o_min:
+                if error < 0:
+                    acc = integral[i]
+                    step = 0
+                output = o_min
+
+            integral[i] = acc
+            step_buf[i] = step
+            err_buf[i] = error
+            prev_error[i] = error
+            prev_time[i] = now
+            out[i] = output
+
+    def limit_feedback(self, i):
+        """Anti-windup externo: a saída da zona foi cortada depois do PID (ex.: orçamento de potência)"""
+        if self.error[i] > 0 and self.integral_step[i]:
+            self.integral[i] -= self.integral_step[i]
+            self.integral_step[i] = 0
+
+
+# Ponto fixo: temperaturas/erros em Q6 (1/64 °C), ganhos em Q8 e saída em Q14 (= Q6 x Q8).
+# Com ganhos até GAIN_MAX (limite do ajuste no display), erro limitado a ±ERROR_MAX e derivada
+# a ±RATE_MAX, cada produto e a soma da saída ficam abaixo de 2**30 (small int do MicroPython).
+# Float só na conversão da medição e da saída (fronteira com os arrays do chamador).
+FRAC_VAL = 6
+FRAC_GAIN = 8
+FRAC_OUT = FRAC_VAL + FRAC_GAIN
+_VAL_ONE = 1 << FRAC_VAL
+_GAIN_ONE = 1 << FRAC_GAIN
+_OUT_ONE = 1 << FRAC_OUT
+GAIN_MAX = 40
+_ERROR_MAX = (512 << FRAC_VAL) - 1    # ±512 °C
+_RATE_MAX = (1024 << FRAC_VAL) - 1    # ±1024 °C/s (só leitura espúria chega perto)
+SMALL_INT_MAX = 1 << 30
+
+# Desvio máximo da saída (pontos percentuais de duty) em relação ao MultiZonePID (ver test_pid_fixed.py)
+FIXED_TOLERANCE = 0.5
+
+
+class MultiZonePIDFixed:
+    """Mesmo PID do MultiZonePID em inteiros escalados, para o RP2040 (sem FPU).
+
+    Mesma interface; float só na fronteira (medição de entrada, saída e erro gravados
+    nos arrays do chamador). Integral em Q6 °C·s, derivada em Q6 °C/s.
+    """
+    def __init__(self, kp, ki, kd, setpoints, output_min=0, output_max=100,
+                 integral_min=-50, integral_max=50, now=0):
+        n = len(kp)
+        self.n = n
+        self.kp = array('i', [0] * n)
+        self.ki = array('i', [0] * n)
+        self.kd = array('i', [0] * n)
+        self.setpoint = array('i', [0] * n)
+        self.output_min = output_min
+        self.output_max = output_max
+        self._out_min = int(output_min * _OUT_ONE)
+        self._out_max = int(output_max * _OUT_ONE)
+        self.integral_min = array('i', [int(integral_min * _VAL_ONE)] * n)
+        self.integral_max = array('i', [int(integral_max * _VAL_ONE)] * n)
+
+        self.integral = array('i', [0] * n)
+        self.prev_error = array('i', [0] * n)
+        self.prev_time = array('i', [0] * n)
+        self.error = array('f', [0] * n)          # Erro em °C (mesma unidade do motor float)
+        self._error_q = array('i', [0] * n)
+        self._rate_q = array('i', [0] * n)       # Derivada do erro no último passo (Q6 °C/s)
+        self.integral_step = array('i', [0] * n)
+        self.set_gains(kp, ki, kd)
+        self.set_setpoints(setpoints)
+        self.reset(now)
+
+    def reset(self, now):
+        for i in range(self.n):
+            self.integral[i] = 0
+            self.prev_error[i] = 0
+            self.prev_time[i] = now
+            self.integral_step[i] = 0
+
+    def set_gains(self, kp=None, ki=None, kd=None):
+        for i in range(self.n):
+            if kp is not None:
+                self.kp[i] = round(kp[i] * _GAIN_ONE)
+            if ki is not None:
+                self.ki[i] = round(ki[i] * _GAIN_ONE)
+            if kd is not None:
+                self.kd[i] = round(kd[i] * _GAIN_ONE)
+
+    def set_setpoints(self, setpoints):
+        for i in range(self.n):
+            self.setpoint[i] = round(setpoints[i] * _VAL_ONE)
+
+    def compute_all(self, measurements, timestamps, out, start=0, end=None):
+        """Calcula as zonas start..end-1; out[i] recebe a saída limitada da zona i (em %)"""
+        if end is None:
+            end = self.n
+        kp = self.kp
+        ki = self.ki
+        kd = self.kd
+        setpoint = self.setpoint
+        integral = self.integral
+        prev_error = self.prev_error
+        prev_time = self.prev_time
+        err_q = self._error_q
+        rate_q = self._rate_q
+        step_buf = self.integral_step
+        i_min = self.integral_min
+        i_max = self.integral_max
+        o_min = self._out_min
+        o_max = self._out_max
+        for i in range(start, end):
+            now = timestamps[i]
+            dt = ticks_diff(now, prev_time[i])
+            if dt <= 0:
+                continue  # Amostra repetida ou antiga: mantém a saída anterior
+
+            error = setpoint[i] - int(measurements[i] * _VAL_ONE)
+            if error > _ERROR_MAX:
+                error = _ERROR_MAX
+            elif error < -_ERROR_MAX:
+                error = -_ERROR_MAX
+
+            # Termo integral com limite (anti-windup), arredondado para Q6 °C·s;
+            # dt separado em segundos e resto para error * dt não estourar com dt longo
+            step = error * (dt // 1000) + (error * (dt % 1000) + 500) // 1000
+            acc = integral[i] + step
+            if acc < i_min[i]:
+                acc = i_min[i]
+            elif acc > i_max[i]:
+                acc = i_max[i]
+            step = acc - integral[i]  # Parcela efetivamente integrada (após o limite)
+
+            rate = (error - prev_error[i]) * 1000 // dt
+            if rate > _RATE_MAX:
+                rate = _RATE_MAX
+            elif rate < -_RATE_MAX:
+                rate = -_RATE_MAX
+
+            output = kp[i] * error + ki[i] * acc + kd[i] * rate
+
+            # Saída saturada no sentido do erro: mantém a integral de antes deste passo
+            if output > o_max:
+                if error > 0:
+                    acc = integral[i]
+                    step = 0
+                output = o_max
+            elif output < o_min:
+                if error < 0:
+                    acc = integral[i]
+                    step = 0
+                output = o_min
+
+            integral[i] = acc
+            step_buf[i] = step
+            err_q[i] = error
+            rate_q[i] = rate
+            prev_error[i] = error
+            prev_time[i] = now
+            out[i] = output / _OUT_ONE
+            self.error[i] = error / _VAL_ONE
+
+    def limit_feedback(self, i):
+        """Anti-windup externo: a saída da zona foi cortada depois do PID (ex.: orçamento de potência)"""
+        if self._error_q[i] > 0 and self.integral_step[i]:
+            self.integral[i] -= self.integral_step[i]
+            self.integral_step[i] = 0
@@ -1,123 +1,368 @@
 import _thread
 import time
+from array import array
 from Controller.IOs_pico import IO_MODBUS
+from Controller.Modbus_pico import HEALTH_NAMES
+from Controller.PIDMulti_pico import MultiZonePID, MultiZonePIDFixed
+from Controller.Ring_pico import SpscRing, DoubleBuffer
+from Controller.Scheduler_pico import LoopTiming
+
+# Comandos core0 -> core1 (campos: comando, zona, valor)
+CMD_ENABLE = 1
+CMD_SETPOINT = 2
+CMD_KP = 3
+CMD_KI = 4
+CMD_KD = 5
+CMD_PERIOD = 6
+
+
+class _StatusBuffer:
+    """Um lado do instantâneo de status publicado pelo laço de controle"""
+    def __init__(self, n):
+        self.control_active = False
+        self.temperatures = array('f', [0] * n)
+        self.ticks = array('i', [0] * n)
+        self.duty = array('f', [0] * n)
+        self.setpoints = array('f', [0] * n)
+        self.kp = array('f', [0] * n)
+        self.ki = array('f', [0] * n)
+        self.kd = array('f', [0] * n)
+        self.periods = array('f', [0] * n)
+        # Saúde do barramento por zona (Controller/Modbus_pico: HEALTH_*)
+        self.bus_state = array('b', [0] * n)
+        self.bus_failures = array('i', [0] * n)
+        self.rtt_ms = array('i', [0] * n)
+        self.timeout_ms = array('i', [0] * n)
+
+
+def _copy_status(buf, out):
+    out['control_active'] = buf.control_active
+    out['temperatures'] = list(buf.temperatures)
+    out['duty'] = list(buf.duty)
+    out['setpoints'] = list(buf.setpoints)
+    out['kp'] = list(buf.kp)
+    out['ki'] = list(buf.ki)
+    out['kd'] = list(buf.kd)
+    out['periods'] = list(buf.periods)
+    out['bus'] = [(buf.bus_state[i], buf.bus_failures[i], buf.rtt_ms[i], buf.timeout_ms[i])
+                  for i in range(len(buf.bus_state))]
+
+
+def _copy_temperatures(buf, out):
+    for i in range(len(buf.temperatures)):
+        out[i] = buf.temperatures[i]
+
 
 class PIDController:
     def __init__(self, kp_list=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0], ki_list=[0.5, 0.5, 0.5, 0.5, 0.5, 0.5], 
                  kd_list=[0.05, 0.05, 0.05, 0.05, 0.05, 0.05], setpoint_list=[180, 180, 180, 180, 180, 180], 
-                 io_modbus=None, adr=[1, 2, 3, 4, 5, 6]):
-        self.kp_list = kp_list
-        self.ki_list = ki_list
-        self.kd_list = kd_list
-        self.setpoint_list = setpoint_list
-        self.value_temp = [0, 0, 0, 0, 0, 0]
+                 io_modbus=None, adr=[1, 2, 3, 4, 5, 6], power_budget=None, fixed_point=False,
+                 period_list=None, poll_policy=None):
+        # Cópias: depois do start só o laço de controle altera estas listas (via fila de comandos)
+        self.kp_list = kp_list[:]
+        self.ki_list = ki_list[:]
+        self.kd_list = kd_list[:]
+        self.setpoint_list = setpoint_list[:]
+        # Período de amostragem de cada zona em segundos (None = todas no intervalo do start)
+        self.period_list = period_list[:] if period_list is not None else None
+        self.value_temp = [0] * len(adr)
+        self.value_tick = array('i', [0] * len(adr))  # ticks_ms da recepção de cada amostra de value_temp
+        self.max_sample_age_ms = 5000  # Sem amostra válida há mais que isso (ou 3 períodos da zona): zona desligada
+        self._period_ms = array('i', [1000] * len(adr))
+        self._poll_ms = array('i', [1000] * len(adr))  # Período efetivo (ajustado pela política de leitura)
+        # Política opcional (Controller/PollPolicy_pico.AdaptivePoll): lê mais rápido em rampa
+        # ou perto do setpoint e mais devagar com a zona estável
+        self.poll_policy = poll_policy
+        self._due = array('i', [0] * len(adr))  # ticks_ms em que cada zona deve ser lida de novo
+        self._zonas = array('b', [0] * len(adr))  # Zonas vencidas do ciclo (preenchido por _due_zones)
+        # Amostras da varredura em andamento (publicadas zona a zona)
+        self._sample = [0] * len(adr)
+        self._sample_tick = array('i', [0] * len(adr))
+        self._duty_pid = array('f', [0] * len(adr))  # Saída pedida pelo PID
+        self._duty_out = array('f', [0] * len(adr))  # Saída aplicada (após o orçamento de potência)
+        # Orçamento de potência opcional (Controller/Potencia_pico.PowerBudget) entre PID e saídas
+        self.power_budget = power_budget
 
         # Validação para evitar None
         if io_modbus is None:
             raise ValueError("io_modbus não pode ser None. Passe uma instância de IO_MODBUS.")
         self.io_modbus = io_modbus
         self.adr = adr
-        self.integral = [0] * len(adr)
-        self.previous_error = [0] * len(adr)
-        self.previous_time = [time.ticks_ms()] * len(adr)
         self._running = False
         self._control_flag = False
         self._thread_id = None
         self._use_thread = False  # Flag para indicar se está usando thread
+        self._scheduler = None  # Controller/Scheduler_pico.Core1Scheduler, quando usado
+        self._scanning = False  # Varredura do ciclo em andamento
+        self.timing = LoopTiming(1000)  # Período fixo do ciclo base (ajustado em start)
         
-        # Limites para anti-windup
+        # Estado e coeficientes de todas as zonas em arrays (limites de saída e anti-windup no motor)
+        # fixed_point=True usa inteiros escalados (RP2040 não tem FPU)
         self.output_min = 0
         self.output_max = 100
-        self.integral_min = [-50] * len(adr)  # Limites do termo integral
-        self.integral_max = [50] * len(adr)
+        self.fixed_point = fixed_point
+        motor = MultiZonePIDFixed if fixed_point else MultiZonePID
+        self.pid = motor(kp_list, ki_list, kd_list, setpoint_list,
+                         output_min=self.output_min, output_max=self.output_max,
+                         integral_min=-50, integral_max=50, now=time.ticks_ms())
         
-        # Lock para sincronização (Pi Pico 2 tem 2 cores)
-        self._lock = _thread.allocate_lock()
+        # Troca entre cores sem lock (Pi Pico 2 tem 2 cores): comandos core0 -> core1,
+        # amostras core1 -> core0 e um instantâneo de status em buffer duplo para o UI
+        n = len(adr)
+        self.commands = SpscRing(32, 'bbf')
+        self.samples = SpscRing(32, 'bfi')
+        self._cmd = [0, 0, 0]  # Registro de trabalho do consumidor de comandos (core1)
+        self._rec = [0, 0, 0]  # Registro de trabalho do consumidor de amostras (core0)
+        self._status = DoubleBuffer(lambda: _StatusBuffer(n))
+        if self.period_list is not None:
+            self._set_periods(self.period_list)
+        self._publish()
 
     def compute(self, current_value, index):
-        current_time = time.ticks_ms()
-        dt = time.ticks_diff(current_time, self.previous_time[index]) / 1000.0  # Converte para segundos
-        
-        if dt <= 0:
-            dt = 0.001  # Evita divisão por zero
-        
-        # Controle PID direto com o setpoint final
-        error = self.setpoint_list[index] - current_value
-        
-        # Termo Proporcional
-        proportional = self.kp_list[index] * error
-        
-        # Termo Integral com anti-windup
-        self.integral[index] += error * dt
-        # Limita o termo integral para evitar windup
-        self.integral[index] = max(self.integral_min[index], min(self.integral_max[index], self.integral[index]))
-        integral_term = self.ki_list[index] * self.integral[index]
-        
-        # Termo Derivativo
-        derivative = (error - self.previous_error[index]) / dt
-        derivative_term = self.kd_list[index] * derivative
-        
-        # Saída PID
-        output = proportional + integral_term + derivative_term
-        
-        # Limita a saída e implementa anti-windup
-        output_limited = max(self.output_min, min(self.output_max, output))
-        
-        # Anti-windup: se a saída está saturada, não acumula mais no integral
-        if output != output_limited:
-            # Remove o excesso do integral
-            if output > output_limited and error > 0:
-                self.integral[index] -= error * dt
-            elif output < output_limited and error < 0:
-                self.integral[index] -= error * dt
-        
-        # Atualiza valores anteriores
-        self.previous_error[index] = error
-        self.previous_time[index] = current_time
+        """Calcula uma zona isolada (mesmo motor do compute_all do ciclo)"""
+        self.value_temp[index] = current_value
+        self.value_tick[index] = time.ticks_ms()
+        self.pid.compute_all(self.value_temp, self.value_tick, self._duty_pid, index, index + 1)
+        return self._duty_pid[index]
+
+    def limit_feedback(self, index):
+        """Anti-windup externo: a saída da zona foi cortada depois do PID (ex.: orçamento de potência)"""
+        self.pid.limit_feedback(index)
+
+    def _apply_outputs(self, index):
+        """Aplica a saída da zona; com orçamento de potência redistribui entre todas as zonas"""
+        if self.power_budget is not None:
+            self.power_budget.allocate(self._duty_pid, self.pid.error, self._duty_out)
+            for i in range(len(self.adr)):
+                if self.power_budget.limitado[i]:
+                    self.limit_feedback(i)
+            self.io_modbus.io_rpi.set_all_duty(self._duty_out, self.adr)
+        else:
+            self._duty_out[index] = self._duty_pid[index]
+            self.io_modbus.io_rpi.aciona_pwm(self._duty_out[index], self.adr[index])
+
+    def _on_sample(self, i):
+        """Chamado pelo scan ao fim da transação da zona i: publica a amostra; com o controle ativo, calcula e aciona"""
+        self._drain_commands()
+        now = time.ticks_ms()
+        if self._sample_tick[i] != self.value_tick[i]:
+            self.samples.push(i, self._sample[i], self._sample_tick[i])
+            # Leitura válida: próxima na grade do período da zona (falhas tentam de novo no próximo ciclo)
+            periodo = self._period_ms[i]
+            if self.poll_policy is not None:
+                periodo = self.poll_policy.period_ms(i, self._sample[i], self._sample_tick[i],
+                                                     self.setpoint_list[i], periodo)
+            self._poll_ms[i] = periodo
+            due = time.ticks_add(self._due[i], periodo)
+            self._due[i] = due if time.ticks_diff(due, now) > 0 else time.ticks_add(now, periodo)
+        else:
+            # Falha de leitura ou circuito aberto: o core0 recebe -1 (o tick continua o da última leitura válida)
+            self.samples.push(i, self._sample[i], self._sample_tick[i])
+        self.value_temp[i] = self._sample[i]
+        self.value_tick[i] = self._sample_tick[i]
+        if not self._control_flag:
+            self._publish()  # Controle desligado: só a leitura (saídas zeradas no início do ciclo)
+            return
+        self.pid.compute_all(self.value_temp, self.value_tick, self._duty_pid, i, i + 1)
+        # Sensor sem resposta há mais de max_sample_age_ms (ou 3 períodos da zona): zona desligada
+        if time.ticks_diff(now, self.value_tick[i]) > max(self.max_sample_age_ms, 3 * self._poll_ms[i]):
+            self._duty_pid[i] = 0
+        self._apply_outputs(i)
+        self._publish()
+
+    def _send(self, cmd, zona, valor):
+        """core0: envia um comando ao laço de controle (aplica direto se o laço não estiver rodando)"""
+        if not self._running:
+            self._apply(cmd, zona, valor)
+            self._publish()
+        elif not self.commands.push(cmd, zona, valor):
+            print("Aviso: fila de comandos do PID cheia, comando descartado")
 
-        return output_limited
+    def _drain_commands(self):
+        """Laço de controle: aplica os comandos recebidos do core0"""
+        aplicou = False
+        cmd = self._cmd
+        while self.commands.pop(cmd):
+            self._apply(cmd[0], cmd[1], cmd[2])
+            aplicou = True
+        if aplicou:
+            self._publish()
+
+    def _apply(self, cmd, zona, valor):
+        if cmd == CMD_ENABLE:
+            self._control_flag = bool(valor)
+            if not valor:
+                # Resetar estados internos ao desativar o controle
+                self.pid.reset(time.ticks_ms())
+                if self.poll_policy is not None:
+                    self.poll_policy.reset()
+        elif cmd == CMD_SETPOINT:
+            self.setpoint_list[zona] = valor
+            self.pid.set_setpoints(self.setpoint_list)
+            self._due[zona] = time.ticks_ms()  # Zona em leitura lenta: lê já no próximo ciclo
+        elif cmd == CMD_KP:
+            self.kp_list[zona] = valor
+            self.pid.set_gains(kp=self.kp_list)
+        elif cmd == CMD_KI:
+            self.ki_list[zona] = valor
+            self.pid.set_gains(ki=self.ki_list)
+        elif cmd == CMD_KD:
+            self.kd_list[zona] = valor
+            self.pid.set_gains(kd=self.kd_list)
+        elif cmd == CMD_PERIOD:
+            self.period_list[zona] = valor
+            self._set_periods(self.period_list)
+
+    def _set_periods(self, period_list):
+        """Períodos por zona (s); o ciclo base do laço passa a ser o menor deles"""
+        for i in range(len(self.adr)):
+            self._period_ms[i] = max(1, int(period_list[i] * 1000))
+            self._poll_ms[i] = self._period_ms[i]
+            self._due[i] = time.ticks_ms()  # Lê já no próximo ciclo com o novo período
+        base = min(self._period_ms)
+        if self.poll_policy is not None:
+            base = min(base, max(1, self.poll_policy.fast_ms))  # O ciclo base acompanha a leitura rápida
+        if self._running:
+            base = min(base, int(self.interval * 1000))
+        if base != self.timing.period_ms:
+            self.timing.set_period(base)
+            if self._scheduler is not None:
+                self._scheduler.set_period('pid', base)
+
+    def _due_zones(self, now):
+        """Preenche _zonas com as zonas cuja leitura venceu, da mais atrasada para a menos; retorna quantas.
+
+        Inserção direta no buffer pré-alocado: o ciclo base roda no core1 sem alocar.
+        """
+        zonas = self._zonas
+        due = self._due
+        count = 0
+        for i in range(len(self.adr)):
+            atraso = time.ticks_diff(now, due[i])
+            if atraso < 0:
+                continue
+            j = count
+            while j > 0 and time.ticks_diff(now, due[zonas[j - 1]]) < atraso:
+                zonas[j] = zonas[j - 1]
+                j -= 1
+            zonas[j] = i
+            count += 1
+        return count
+
+    def _publish(self):
+        """Laço de controle: grava o estado no buffer livre do instantâneo e o publica"""
+        buf = self._status.back()
+        buf.control_active = self._control_flag
+        for i in range(len(self.adr)):
+            buf.temperatures[i] = self.value_temp[i]
+            buf.ticks[i] = self.value_tick[i]
+            buf.duty[i] = self._duty_out[i]
+            buf.setpoints[i] = self.setpoint_list[i]
+            buf.kp[i] = self.kp_list[i]
+            buf.ki[i] = self.ki_list[i]
+            buf.kd[i] = self.kd_list[i]
+            buf.periods[i] = self._poll_ms[i] / 1000
+            bus = self.io_modbus.peek_bus(self.adr[i])
+            buf.bus_state[i] = bus[0]
+            buf.bus_failures[i] = bus[1]
+            buf.rtt_ms[i] = bus[2]
+            buf.timeout_ms[i] = bus[3]
+        self._status.publish()
 
     def control_pwm(self):
-        """Função de controle PWM executada na thread"""
-        if self._control_flag and self.io_modbus is not None:
+        """Executa um ciclo completo de controle (bloqueia até o fim da varredura)"""
+        self._start_cycle()
+        while self._scanning:
+            self._poll_cycle()
+
+    def _start_cycle(self):
+        """Tarefa 'pid': inicia a varredura do ciclo; com o controle inativo desliga as saídas e só lê"""
+        self._drain_commands()
+        if self.io_modbus is None:
+            return
+        if self._scanning:
+            return  # Ciclo anterior ainda no barramento: fica para o próximo período
+        now = time.ticks_ms()
+        self.timing.begin(now)
+        if not self._control_flag:
+            # Set PWM to 0 when control flag is False
             try:
-                with self._lock:
-                    for i, adr in enumerate(self.adr):
-                        self.value_temp[i] = self.io_modbus.get_temperature_channel(adr)
-                        
-                        pid_output = self.compute(self.value_temp[i], i)
-                        pwm_value = pid_output  # A saída já está limitada na função compute
-                        self.io_modbus.io_rpi.aciona_pwm(duty_cycle=pwm_value, saida=adr)
-
-                    # Verifica se todos os canais atingiram o setpoint dentro da faixa permitida
-                    all_channels_ready = True
-                    for j, setpoint in enumerate(self.setpoint_list):
-                        if not (setpoint * 0.92 <= self.value_temp[j] <= setpoint * 1.08):  # Faixa de 92% a 108% do setpoint
-                            all_channels_ready = False
-                            break
-
-                    # Aciona a saída de máquina pronta se todos os canais estiverem prontos
-                    if all_channels_ready:
-                        self.io_modbus.io_rpi.aciona_maquina_pronta(False)
-                    else:
-                        self.io_modbus.io_rpi.aciona_maquina_pronta(True)
+                for i in range(len(self.adr)):
+                    self._duty_pid[i] = 0
+                    self._duty_out[i] = 0
+                self.io_modbus.io_rpi.set_all_duty(self._duty_out, self.adr)
+                self._publish()
             except Exception as e:
-                print(f"Erro no controle PWM: {e}")
+                print(f"Erro ao desligar PWM: {e}")
+        try:
+            # Multi-taxa: só as zonas com leitura vencida, mais atrasadas primeiro
+            count = self._due_zones(now)
+            # Cada zona é publicada (e, com o controle ativo, calculada e acionada) assim que
+            # sua resposta chega (_on_sample); com o controle inativo o UI continua recebendo leituras
+            # Limita o tempo de barramento do ciclo (escravos mudos não travam o loop)
+            self.io_modbus.begin_cycle()
+            # Varre as zonas (barramentos em paralelo quando há duas UARTs)
+            self.io_modbus.scan_start(self.adr, self._sample, self._sample_tick, self._on_sample,
+                                      self._zonas, count)
+            self._scanning = True
+        except Exception as e:
+            print(f"Erro no controle PWM: {e}")
+        if not self._scanning:
+            self.io_modbus.end_cycle()
+            self.timing.end(time.ticks_ms())
         else:
-            # Set PWM to 0 when control flag is False or io_modbus is None
-            if self.io_modbus is not None:
-                try:
-                    pwm_value = 0
-                    for adr in self.adr:
-                        self.io_modbus.io_rpi.aciona_pwm(duty_cycle=pwm_value, saida=adr)
-                except Exception as e:
-                    print(f"Erro ao desligar PWM: {e}")
-
-    def start(self, interval=1):
-        """Inicia o controle PID em uma thread separada"""
+            self._poll_cycle()
+
+    def _poll_cycle(self):
+        """Tarefa 'barramento': avança as transações sem bloquear e fecha o ciclo ao terminar"""
+        self._drain_commands()
+        if not self._scanning:
+            if not self._running and self._scheduler is not None:
+                self._scheduler.remove('barramento')  # Após stop()
+            return
+        try:
+            if self.io_modbus.scan_poll():
+                return
+        except Exception as e:
+            print(f"Erro no controle PWM: {e}")
+        self._scanning = False
+        self.io_modbus.end_cycle()
+        self.timing.end(time.ticks_ms())
+        if not self._control_flag:
+            return
+        try:
+            # Verifica se todos os canais atingiram o setpoint dentro da faixa permitida
+            all_channels_ready = True
+            for j, setpoint in enumerate(self.setpoint_list):
+                if not (setpoint * 0.92 <= self.value_temp[j] <= setpoint * 1.08):  # Faixa de 92% a 108% do setpoint
+                    all_channels_ready = False
+                    break
+
+            # Aciona a saída de máquina pronta se todos os canais estiverem prontos
+            if all_channels_ready:
+                self.io_modbus.io_rpi.aciona_maquina_pronta(False)
+            else:
+                self.io_modbus.io_rpi.aciona_maquina_pronta(True)
+        except Exception as e:
+            print(f"Erro no controle PWM: {e}")
+
+    def start(self, interval=1, scheduler=None):
+        """Inicia o controle PID no escalonador do core1, ou em uma thread separada sem escalonador"""
         if not self._running:
             self._running = True
             self.interval = interval
+            if self.period_list is None:
+                self.period_list = [interval] * len(self.adr)
+            self._set_periods(self.period_list)
+            if scheduler is not None:
+                # Ciclo base a cada interval (ou menor período de zona); o barramento é atendido
+                # em passos curtos entre as outras tarefas
+                self._scheduler = scheduler
+                scheduler.add('pid', self._start_cycle, self.timing.period_ms)
+                scheduler.add('barramento', self._poll_cycle, 2)
+                self._use_thread = True
+                print(f"PID registrado no escalonador (intervalo de {interval}s)")
+                return
             try:
                 # Tenta usar o segundo core, se falhar usa modo sem thread
                 self._thread_id = _thread.start_new_thread(self._run, (interval,))
@@ -138,7 +383,11 @@ class PIDController:
         """Para o controle PID"""
         if self._running:
             self._running = False
-            if hasattr(self, '_use_thread') and self._use_thread:
+            if self._scheduler is not None:
+                # A tarefa 'barramento' sai sozinha depois de fechar a varredura em andamento
+                self._scheduler.remove('pid')
+                print("PID removido do escalonador")
+            elif hasattr(self, '_use_thread') and self._use_thread:
                 print("Thread PID parando...")
                 # No MicroPython não temos join(), então apenas marcamos para parar
                 time.sleep_ms(100)  # Pequena pausa para a thread terminar
@@ -152,60 +401,77 @@ class PIDController:
         while self._running:
             try:
                 self.control_pwm()
-                time.sleep(interval)
             except Exception as e:
-                print(f"Erro na thread PID: {e}")
-                time.sleep(interval)  # Continua executando mesmo com erro
+                print(f"Erro na thread PID: {e}")  # Continua executando mesmo com erro
+            # Espera até o próximo prazo absoluto: o período não soma o tempo de barramento
+            if self.timing.deadline is None:
+                time.sleep_ms(self.timing.period_ms)  # Nenhum ciclo marcou prazo ainda
+            else:
+                time.sleep_ms(self.timing.wait_ms(time.ticks_ms()))
         
         print("Thread PID finalizada")
 
     def set_control_flag(self, flag):
-        """Define se o controle está ativo ou não"""
-        with self._lock:
-            self._control_flag = flag
-
-            # Atualiza as temperaturas atuais antes de verificar o flag
-            if self.io_modbus is not None:
-                try:
-                    for i, adr in enumerate(self.adr):
-                        self.value_temp[i] = self.io_modbus.get_temperature_channel(adr)
-                except Exception as e:
-                    print(f"Erro ao ler temperaturas: {e}")
-
-            if not flag:
-                # Resetar estados internos ao desativar o controle
-                self.integral = [0] * len(self.adr)
-                self.previous_error = [0] * len(self.adr)
-                self.previous_time = [time.ticks_ms()] * len(self.adr)
-                print("Controle PID desativado e estados resetados")
-            else:
-                print("Controle PID ativado")
-
-    def update_parameters(self, kp_list=None, ki_list=None, kd_list=None, setpoint_list=None):
-        """Atualiza os parâmetros PID em tempo real"""
-        with self._lock:
-            if kp_list is not None:
-                self.kp_list = kp_list[:]
-            if ki_list is not None:
-                self.ki_list = ki_list[:]
-            if kd_list is not None:
-                self.kd_list = kd_list[:]
-            if setpoint_list is not None:
-                self.setpoint_list = setpoint_list[:]
-            print("Parâmetros PID atualizados")
+        """Define se o controle está ativo ou não (aplicado pelo laço de controle)"""
+        self._send(CMD_ENABLE, 0, 1 if flag else 0)
+        if not flag:
+            print("Controle PID desativado e estados resetados")
+        else:
+            print("Controle PID ativado")
+
+    def update_parameters(self, kp_list=None, ki_list=None, kd_list=None, setpoint_list=None,
+                          period_list=None):
+        """Atualiza os parâmetros PID em tempo real (um comando por zona e parâmetro)"""
+        if period_list is not None and self.period_list is None:
+            self.period_list = period_list[:]  # Antes do start: só guarda
+            period_list = None
+        for cmd, valores in ((CMD_KP, kp_list), (CMD_KI, ki_list), (CMD_KD, kd_list),
+                             (CMD_SETPOINT, setpoint_list), (CMD_PERIOD, period_list)):
+            if valores is not None:
+                for i in range(len(self.adr)):
+                    self._send(cmd, i, valores[i])
+        print("Parâmetros PID atualizados")
+
+    def read_temperatures(self, out):
+        """Copia as últimas temperaturas publicadas para out, sem lock"""
+        return self._status.read(_copy_temperatures, out)
+
+    def drain_samples(self, values, ticks=None):
+        """core0: consome as amostras novas (zona, valor, tick) em values/ticks; retorna quantas leu.
+
+        Leituras que falharam chegam com valor -1 e o tick da última leitura válida.
+        """
+        rec = self._rec
+        count = 0
+        while self.samples.pop(rec):
+            i = rec[0]
+            values[i] = rec[1]
+            if ticks is not None:
+                ticks[i] = rec[2]
+            count += 1
+        return count
 
     def get_status(self):
-        """Retorna o status atual do controlador"""
-        with self._lock:
-            return {
-                'running': self._running,
-                'control_active': self._control_flag,
-                'temperatures': self.value_temp[:],
-                'setpoints': self.setpoint_list[:],
-                'kp': self.kp_list[:],
-                'ki': self.ki_list[:],
-                'kd': self.kd_list[:]
+        """Retorna o status atual do controlador (instantâneo publicado pelo laço, sem lock)"""
+        status = self._status.read(_copy_status, {})
+        status['running'] = self._running
+        # Saúde do barramento vem do instantâneo: os dicionários do IO_MODBUS são do core1
+        bus = status.pop('bus')
+        status['modbus'] = {}
+        for i in range(len(self.adr)):
+            state, failures, rtt_ms, timeout_ms = bus[i]
+            status['modbus'][self.adr[i]] = {
+                'state': HEALTH_NAMES[state],
+                'failures': failures,
+                'rtt_ms': rtt_ms,
+                'timeout_ms': timeout_ms
             }
+        status['scheduler'] = self._scheduler.get_stats() if self._scheduler is not None else None
+        status['power'] = self.power_budget.get_status() if self.power_budget is not None else None
+        status['samples_lost'] = self.samples.overflows
+        status['timing'] = self.timing.get_stats()
+        status['poll'] = self.poll_policy.get_status() if self.poll_policy is not None else None
+        return status
 
 
 # Exemplo de uso
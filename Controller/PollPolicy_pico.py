@@ -0,0 +1,98 @@
+import time
+from array import array
+
+# Modo de leitura de cada zona
+POLL_NORMAL = 0  # Período configurado da zona (period_list)
+POLL_FAST = 1    # Rampa, erro grande ou perto de cruzar o setpoint
+POLL_SLOW = 2    # Estável na faixa há stable_s segundos
+POLL_NAMES = ('normal', 'fast', 'slow')
+
+
+class AdaptivePoll:
+    """Ajusta o período de leitura de cada zona pela atividade do processo.
+
+    Lê rápido quando a zona está em rampa, com erro grande ou prestes a cruzar o setpoint
+    (fora de ±band), e desacelera depois de ficar stable_s segundos dentro de ±band do setpoint.
+    """
+    def __init__(self, n, fast_s=0.5, slow_s=5.0, band=2.0, error_fast=10.0,
+                 ramp_fast=0.5, horizon_s=10.0, stable_s=60.0):
+        self.fast_ms = int(fast_s * 1000)
+        self.slow_ms = int(slow_s * 1000)
+        self.band = band              # °C em torno do setpoint considerados estáveis
+        self.error_fast = error_fast  # °C de erro acima dos quais lê rápido
+        self.ramp_fast = ramp_fast    # °C/s de inclinação acima dos quais lê rápido
+        self.horizon_s = horizon_s    # Cruzamento previsto dentro deste tempo: lê rápido
+        self.stable_ms = int(stable_s * 1000)
+        self.modo = array('b', [POLL_NORMAL] * n)
+        self._last_value = array('f', [0] * n)
+        self._last_tick = array('i', [0] * n)
+        self._last_error = array('f', [0] * n)
+        self._has_last = array('b', [0] * n)
+        self._in_band = array('b', [0] * n)
+        self._band_since = array('i', [0] * n)
+
+    @classmethod
+    def from_config(cls, n, config):
+        """Cria a política a partir do dicionário salvo junto dos valores PID"""
+        return cls(n, fast_s=config.get("fast_s", 0.5), slow_s=config.get("slow_s", 5.0),
+                   band=config.get("band", 2.0), error_fast=config.get("error_fast", 10.0),
+                   ramp_fast=config.get("ramp_fast", 0.5), horizon_s=config.get("horizon_s", 10.0),
+                   stable_s=config.get("stable_s", 60.0))
+
+    def get_config(self):
+        return {
+            "fast_s": self.fast_ms / 1000,
+            "slow_s": self.slow_ms / 1000,
+            "band": self.band,
+            "error_fast": self.error_fast,
+            "ramp_fast": self.ramp_fast,
+            "horizon_s": self.horizon_s,
+            "stable_s": self.stable_ms / 1000
+        }
+
+    def reset(self):
+        for i in range(len(self.modo)):
+            self.modo[i] = POLL_NORMAL
+            self._has_last[i] = 0
+            self._in_band[i] = 0
+
+    def period_ms(self, i, value, tick, setpoint, normal_ms):
+        """Nova amostra válida da zona i: retorna o período até a próxima leitura"""
+        error = setpoint - value
+        slope = 0.0
+        if self._has_last[i]:
+            dt = time.ticks_diff(tick, self._last_tick[i])
+            if dt > 0:
+                slope = (value - self._last_value[i]) * 1000 / dt
+        # Cruzamento e aproximação só contam fora da faixa: dentro dela o ruído da leitura
+        # (ex.: 179,9 -> 180,0) cruzaria o setpoint a toda hora e zeraria o tempo de estabilidade
+        fora = abs(error) > self.band
+        cruzou = fora and self._has_last[i] and error * self._last_error[i] < 0
+        # Indo em direção ao setpoint e chegando lá dentro do horizonte
+        chegando = fora and error * slope > 0 and abs(error) < abs(slope) * self.horizon_s
+
+        if abs(error) > self.error_fast or abs(slope) > self.ramp_fast or cruzou or chegando:
+            modo = POLL_FAST
+            self._in_band[i] = 0
+        elif abs(error) <= self.band:
+            if not self._in_band[i]:
+                self._in_band[i] = 1
+                self._band_since[i] = tick
+            modo = POLL_SLOW if time.ticks_diff(tick, self._band_since[i]) >= self.stable_ms else POLL_NORMAL
+        else:
+            modo = POLL_NORMAL
+            self._in_band[i] = 0
+
+        self._last_value[i] = value
+        self._last_tick[i] = tick
+        self._last_error[i] = error
+        self._has_last[i] = 1
+        self.modo[i] = modo
+        if modo == POLL_FAST:
+            return min(self.fast_ms, normal_ms)
+        if modo == POLL_SLOW:
+            return max(self.slow_ms, normal_ms)
+        return normal_ms
+
+    def get_status(self):
+        return [POLL_NAMES[m] for m in self.modo]
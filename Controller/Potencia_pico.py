@@ -0,0 +1,100 @@
+from array import array
+
+# Critérios de divisão quando a demanda passa do orçamento
+MODO_PROPORCIONAL = 'proporcional'  # Potência dividida na proporção do erro de cada zona
+MODO_PRIORIDADE = 'prioridade'      # Zonas atendidas na ordem de prioridade
+
+
+class PowerBudget:
+    """Limita a soma de (duty x potência nominal) das zonas a um orçamento total em watts"""
+    def __init__(self, rated_watts, budget_watts, modo=MODO_PROPORCIONAL, prioridades=None):
+        n = len(rated_watts)
+        self.rated_watts = array('f', rated_watts)
+        self.budget_watts = budget_watts
+        self.modo = modo
+        # Índices das zonas da mais para a menos prioritária (modo prioridade); zonas fora da
+        # lista entram no fim, na ordem natural, para que nenhuma fique fora do orçamento
+        self.prioridades = []
+        for i in (prioridades if prioridades is not None else ()):
+            if 0 <= i < n and i not in self.prioridades:
+                self.prioridades.append(i)
+        for i in range(n):
+            if i not in self.prioridades:
+                self.prioridades.append(i)
+        self.limitado = array('b', [0] * n)  # 1 = zona recebeu menos que o PID pediu
+        self.allocated_watts = 0.0
+        self._pendente = array('b', [0] * n)
+
+    def allocate(self, requested, errors, out):
+        """Distribui o orçamento: escreve em out o duty permitido de cada zona e retorna os watts usados"""
+        rated = self.rated_watts
+        n = len(rated)
+        demanda = 0.0
+        for i in range(n):
+            out[i] = requested[i]
+            self.limitado[i] = 0
+            demanda += requested[i] * rated[i] / 100
+        if demanda <= self.budget_watts:
+            self.allocated_watts = demanda
+            return demanda
+
+        if self.modo == MODO_PRIORIDADE:
+            restante = self.budget_watts
+            for i in self.prioridades:
+                watts = min(requested[i] * rated[i] / 100, restante)
+                out[i] = watts * 100 / rated[i] if rated[i] > 0 else 0
+                restante -= watts
+        else:
+            self._proporcional(requested, errors, out)
+
+        total = 0.0
+        for i in range(n):
+            if out[i] < requested[i] - 0.01:
+                self.limitado[i] = 1
+            total += out[i] * rated[i] / 100
+        self.allocated_watts = total
+        return total
+
+    def _proporcional(self, requested, errors, out):
+        """Divide o orçamento pelo erro positivo de cada zona; quem pede menos que sua parte é
+        atendido por inteiro e a sobra é redistribuída entre as demais"""
+        rated = self.rated_watts
+        pendente = self._pendente
+        n = len(rated)
+        restante = self.budget_watts
+        for i in range(n):
+            pendente[i] = 1 if requested[i] > 0 and rated[i] > 0 else 0
+            if not pendente[i]:
+                out[i] = 0
+        mudou = True
+        while mudou:
+            mudou = False
+            peso_total = 0.0
+            for i in range(n):
+                if pendente[i]:
+                    peso_total += max(errors[i], 0.1)  # Erro mínimo: toda zona pedindo recebe algo
+            if peso_total <= 0:
+                return
+            for i in range(n):
+                if not pendente[i]:
+                    continue
+                parte = restante * max(errors[i], 0.1) / peso_total
+                watts = requested[i] * rated[i] / 100
+                if watts <= parte:
+                    out[i] = requested[i]
+                    restante -= watts
+                    pendente[i] = 0
+                    mudou = True
+            if mudou:
+                continue
+            for i in range(n):
+                if pendente[i]:
+                    parte = restante * max(errors[i], 0.1) / peso_total
+                    out[i] = parte * 100 / rated[i]
+
+    def get_status(self):
+        return {
+            'budget_w': self.budget_watts,
+            'allocated_w': self.allocated_watts,
+            'limited': list(self.limitado)
+        }
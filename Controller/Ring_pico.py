@@ -0,0 +1,77 @@
+from array import array
+
+# Posições em SpscRing._idx (cada uma escrita por um só lado)
+_HEAD = 0  # Produtor: próxima posição a escrever
+_TAIL = 1  # Consumidor: próxima posição a ler
+
+
+class SpscRing:
+    """Fila circular de um produtor e um consumidor (um por core), sem lock e sem alocação.
+
+    Cada registro tem três campos, um array por campo com os tipos de 'tipos' (ex.: 'bfi').
+    O produtor só escreve head e o consumidor só escreve tail; os dados do registro são
+    gravados antes de head avançar, então o consumidor nunca vê um registro pela metade.
+    """
+    def __init__(self, slots, tipos='bfi'):
+        size = 1
+        while size < slots:
+            size <<= 1  # Potência de 2: índice por máscara
+        self.size = size
+        self._mask = size - 1
+        self._wrap = 2 * size - 1  # Contadores correm em [0, 2*size) para distinguir cheio de vazio
+        self.a = array(tipos[0], [0] * size)
+        self.b = array(tipos[1], [0] * size)
+        self.c = array(tipos[2], [0] * size)
+        self._idx = array('i', [0, 0])
+        self.overflows = 0  # Registros descartados com a fila cheia (contado pelo produtor)
+
+    def __len__(self):
+        return (self._idx[_HEAD] - self._idx[_TAIL]) & self._wrap
+
+    def push(self, a, b, c):
+        """Produtor: enfileira um registro; retorna False (e descarta) se a fila estiver cheia"""
+        head = self._idx[_HEAD]
+        if ((head - self._idx[_TAIL]) & self._wrap) == self.size:
+            self.overflows += 1
+            return False
+        slot = head & self._mask
+        self.a[slot] = a
+        self.b[slot] = b
+        self.c[slot] = c
+        self._idx[_HEAD] = (head + 1) & self._wrap  # Publica o registro
+        return True
+
+    def pop(self, out):
+        """Consumidor: copia o registro mais antigo para out[0..2]; retorna False se vazia"""
+        tail = self._idx[_TAIL]
+        if tail == self._idx[_HEAD]:
+            return False
+        slot = tail & self._mask
+        out[0] = self.a[slot]
+        out[1] = self.b[slot]
+        out[2] = self.c[slot]
+        self._idx[_TAIL] = (tail + 1) & self._wrap  # Libera a posição
+        return True
+
+
+class DoubleBuffer:
+    """Instantâneo em dois buffers: o produtor preenche back() e chama publish(); o leitor usa read() sem lock"""
+    def __init__(self, factory):
+        self._bufs = (factory(), factory())
+        self._seq = array('i', [0])  # Buffer da frente = seq & 1
+
+    def back(self):
+        """Produtor: buffer livre para preencher"""
+        return self._bufs[(self._seq[0] + 1) & 1]
+
+    def publish(self):
+        """Produtor: torna back() o buffer da frente"""
+        self._seq[0] = (self._seq[0] + 1) & 0x3FFFFFFF
+
+    def read(self, copy, out):
+        """Leitor: copy(buffer, out) do buffer da frente; repete se houve publicação durante a cópia"""
+        while True:
+            seq = self._seq[0]
+            copy(self._bufs[seq & 1], out)
+            if self._seq[0] == seq:
+                return out
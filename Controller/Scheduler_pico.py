@@ -0,0 +1,223 @@
+import _thread
+import time
+from array import array
+
+# Limites superiores (ms) das faixas do histograma de jitter; a última faixa é "acima de 100 ms"
+JITTER_BINS_MS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Task:
+    """Tarefa periódica do escalonador; tempos de execução medidos em µs"""
+    def __init__(self, name, fn, period_ms, deadline):
+        self.name = name
+        self.fn = fn
+        self.period_ms = max(1, int(period_ms))
+        self.deadline = deadline  # ticks_ms do próximo prazo
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0       # Períodos pulados porque a tarefa (ou outra) atrasou demais
+        self.last_us = 0
+        self._avg8_us = 0     # Média móvel (1/8) do tempo de execução, escalada por 8
+        self.max_us = 0
+        self.late_max_ms = 0  # Maior atraso entre o prazo e o início da execução
+
+    def get_stats(self):
+        return {
+            'period_ms': self.period_ms,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'last_us': self.last_us,
+            'avg_us': self._avg8_us >> 3,
+            'max_us': self.max_us,
+            'late_max_ms': self.late_max_ms
+        }
+
+
+class Core1Scheduler:
+    """Runtime único do core1: tarefas periódicas cooperativas executadas por ordem de prazo.
+
+    Saídas, barramento, PID e watchdog se registram com add(); como só uma thread pode
+    ocupar o core1, todos dividem esta. Cada tarefa deve retornar rápido (sem esperas longas).
+    Se o core1 não estiver disponível, o loop principal chama run_once() no core0.
+    """
+    def __init__(self, idle_ms=10):
+        self._tasks = []  # Substituída inteira em add/remove: o core1 nunca vê a lista pela metade
+        self.idle_ms = idle_ms  # Espera máxima entre verificações quando nenhuma tarefa vence
+        self._running = False
+        self.on_core1 = False
+
+    def add(self, name, fn, period_ms, offset_ms=0):
+        """Registra (ou substitui) a tarefa name, executada a cada period_ms"""
+        task = Task(name, fn, period_ms, time.ticks_add(time.ticks_ms(), offset_ms))
+        tasks = [t for t in self._tasks if t.name != name]
+        tasks.append(task)
+        self._tasks = tasks
+        return task
+
+    def remove(self, name):
+        self._tasks = [t for t in self._tasks if t.name != name]
+
+    def get_task(self, name):
+        for t in self._tasks:
+            if t.name == name:
+                return t
+        return None
+
+    def set_period(self, name, period_ms):
+        task = self.get_task(name)
+        if task is not None:
+            task.period_ms = max(1, int(period_ms))
+
+    def run_once(self):
+        """Executa as tarefas vencidas, do prazo mais antigo para o mais novo; retorna ms até o próximo prazo"""
+        while True:
+            tasks = self._tasks
+            now = time.ticks_ms()
+            due = None
+            for t in tasks:
+                if time.ticks_diff(now, t.deadline) >= 0:
+                    if due is None or time.ticks_diff(t.deadline, due.deadline) < 0:
+                        due = t
+            if due is None:
+                break
+            self._run_task(due, now)
+
+        wait = self.idle_ms
+        now = time.ticks_ms()
+        for t in self._tasks:
+            restante = time.ticks_diff(t.deadline, now)
+            if restante < wait:
+                wait = restante
+        return max(0, wait)
+
+    def _run_task(self, task, now):
+        late = time.ticks_diff(now, task.deadline)
+        if late > task.late_max_ms:
+            task.late_max_ms = late
+        t0 = time.ticks_us()
+        try:
+            task.fn()
+        except Exception as e:
+            task.errors += 1
+            print(f"Erro na tarefa {task.name}: {e}")
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        task.runs += 1
+        task.last_us = dt
+        task._avg8_us += dt - (task._avg8_us >> 3)
+        if dt > task.max_us:
+            task.max_us = dt
+        # Próximo prazo na grade do período; se já passou, pula os períodos perdidos
+        task.deadline = time.ticks_add(task.deadline, task.period_ms)
+        now = time.ticks_ms()
+        if time.ticks_diff(now, task.deadline) > 0:
+            perdidos = time.ticks_diff(now, task.deadline) // task.period_ms + 1
+            task.missed += perdidos
+            task.deadline = time.ticks_add(task.deadline, perdidos * task.period_ms)
+
+    def _run(self):
+        """Laço do core1"""
+        print(f"Escalonador rodando com {len(self._tasks)} tarefas")
+        while self._running:
+            wait = self.run_once()
+            if wait > 0:
+                time.sleep_ms(wait)
+        print("Escalonador finalizado")
+
+    def start(self):
+        """Inicia o laço no core1; retorna False se o core1 estiver ocupado (usar run_once no core0)"""
+        if self._running:
+            return self.on_core1
+        self._running = True
+        try:
+            _thread.start_new_thread(self._run, ())
+            self.on_core1 = True
+            print("Escalonador iniciado no core1")
+        except Exception as e:
+            print(f"Aviso escalonador: {e}")
+            print("Executando tarefas no core principal (run_once no loop)")
+            self.on_core1 = False
+        return self.on_core1
+
+    def stop(self):
+        if self._running:
+            self._running = False
+            if self.on_core1:
+                time.sleep_ms(100)  # Aguarda o laço do core1 terminar
+            self.on_core1 = False
+
+    def get_stats(self):
+        """Estatísticas de execução por tarefa"""
+        stats = {}
+        for t in self._tasks:
+            stats[t.name] = t.get_stats()
+        return stats
+
+
+class LoopTiming:
+    """Contabiliza um laço de período fixo medido contra prazos absolutos (ticks_add).
+
+    begin() marca o início de cada ciclo e end() o fim: atraso de início (jitter) vai para o
+    histograma, ciclos mais longos que o período contam como overrun e prazos pulados como skipped.
+    """
+    def __init__(self, period_ms, late_ms=None):
+        self.period_ms = max(1, int(period_ms))
+        self.late_ms = late_ms if late_ms is not None else max(1, self.period_ms // 10)
+        self.deadline = None   # ticks_ms do próximo início previsto
+        self._start = 0
+        self.cycles = 0
+        self.overruns = 0      # Ciclos que duraram mais que o período
+        self.late_starts = 0   # Inícios com atraso acima de late_ms
+        self.skipped = 0       # Prazos perdidos inteiros (ciclo anterior ou outra tarefa ocupou o período)
+        self.jitter_max_ms = 0
+        self.histogram = array('i', [0] * (len(JITTER_BINS_MS) + 1))
+
+    def set_period(self, period_ms):
+        self.period_ms = max(1, int(period_ms))
+        self.deadline = None
+
+    def begin(self, now):
+        """Início de um ciclo: registra o atraso em relação ao prazo e avança o prazo um período"""
+        if self.deadline is None:
+            self.deadline = now
+        jitter = time.ticks_diff(now, self.deadline)
+        if jitter < 0:
+            jitter = -jitter  # Adiantado (ex.: ciclo disparado fora da grade)
+        k = 0
+        while k < len(JITTER_BINS_MS) and jitter >= JITTER_BINS_MS[k]:
+            k += 1
+        self.histogram[k] += 1
+        if jitter > self.jitter_max_ms:
+            self.jitter_max_ms = jitter
+        if jitter > self.late_ms:
+            self.late_starts += 1
+        self.cycles += 1
+        self._start = now
+        self.deadline = time.ticks_add(self.deadline, self.period_ms)
+        if time.ticks_diff(now, self.deadline) >= 0:
+            perdidos = time.ticks_diff(now, self.deadline) // self.period_ms + 1
+            self.skipped += perdidos
+            self.deadline = time.ticks_add(self.deadline, perdidos * self.period_ms)
+
+    def end(self, now):
+        """Fim do ciclo iniciado em begin()"""
+        if time.ticks_diff(now, self._start) > self.period_ms:
+            self.overruns += 1
+
+    def wait_ms(self, now):
+        """Tempo até o próximo prazo (0 se já venceu)"""
+        if self.deadline is None:
+            return 0
+        return max(0, time.ticks_diff(self.deadline, now))
+
+    def get_stats(self):
+        return {
+            'period_ms': self.period_ms,
+            'cycles': self.cycles,
+            'overruns': self.overruns,
+            'late_starts': self.late_starts,
+            'skipped': self.skipped,
+            'jitter_max_ms': self.jitter_max_ms,
+            'jitter_bins_ms': JITTER_BINS_MS,
+            'jitter_histogram': list(self.histogram)
+        }
@@ -1,14 +1,26 @@
+import sys
 import time
 from Controller.PID_pico import PIDController
 from Controller.IOs_pico import IO_MODBUS, InOut
 from Controller.Dados_pico import Dado
 from Controller.Lcd_pico import Lcd
 from Controller.KY040_pico import KY040
+from Controller.Potencia_pico import PowerBudget
+from Controller.PollPolicy_pico import AdaptivePoll
+from Controller.Scheduler_pico import Core1Scheduler
 import ujson as json
 
 # Constantes para arquivos
 SETPOINT_FILE = "setpoint_list.json"
 PID_VALUES_FILE = "pid_values.json"
+POWER_BUDGET_FILE = "power_budget.json"
+
+# Watchdog alimentado pelo escalonador do core1 (máximo do RP2040: 8388 ms; None desativa)
+WATCHDOG_MS = 8000
+
+# Máximo de resistências ligadas ao mesmo tempo (None = sem limite). Com limite as saídas passam do
+# PWM de hardware, em que todos os canais ligam juntos, para o modo tick com fases defasadas.
+MAX_SIMULTANEAS = None
 
 def save_setpoint_to_file(setpoint_list, filename=SETPOINT_FILE):
     """
@@ -40,9 +52,10 @@ def read_setpoint_from_file(filename=SETPOINT_FILE):
         save_setpoint_to_file(default_setpoint_list, filename)
         return default_setpoint_list
 
-def save_pid_values(kp_list, ki_list, kd_list, filename=PID_VALUES_FILE):
+def save_pid_values(kp_list, ki_list, kd_list, period_list=None, poll_config=None, filename=PID_VALUES_FILE):
     """
-    Salva os valores de Kp, Ki e Kd em um arquivo JSON.
+    Salva os valores de Kp, Ki, Kd, o período de amostragem de cada zona e a política
+    de leitura adaptativa em um arquivo JSON.
     """
     try:
         # Cria um dicionário com os valores
@@ -51,6 +64,10 @@ def save_pid_values(kp_list, ki_list, kd_list, filename=PID_VALUES_FILE):
             "ki": ki_list,
             "kd": kd_list
         }
+        if period_list is not None:
+            pid_values["period"] = period_list
+        if poll_config is not None:
+            pid_values["poll"] = poll_config
 
         # Salva o dicionário no arquivo JSON
         with open(filename, "w") as file:
@@ -61,40 +78,92 @@ def save_pid_values(kp_list, ki_list, kd_list, filename=PID_VALUES_FILE):
 
 def load_pid_values(filename=PID_VALUES_FILE):
     """
-    Carrega os valores de Kp, Ki e Kd de um arquivo JSON.
-    Se o arquivo não existir, cria um com valores padrão.
+    Carrega os valores de Kp, Ki, Kd, os períodos de amostragem (s) e a política de leitura
+    adaptativa de um arquivo JSON. Se o arquivo não existir, cria um com valores padrão.
+    Arquivos antigos sem "period" usam 1 s em todas as zonas; sem "poll", períodos fixos.
     """
     # Valores padrão caso o arquivo não exista
     default_kp = [30.0, 30.0, 30.0, 30.0, 30.0, 30.0]
     default_ki = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
     default_kd = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+    default_period = [1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+    default_poll = AdaptivePoll(6).get_config()
 
     try:
         with open(filename, "r") as file:
             pid_values = json.load(file)
         print(f"Valores PID carregados de {filename}")
-        return pid_values["kp"], pid_values["ki"], pid_values["kd"]
+        return (pid_values["kp"], pid_values["ki"], pid_values["kd"],
+                pid_values.get("period", default_period), pid_values.get("poll"))
     except:
         # Se o arquivo não existir, cria um com valores padrão
         print(f"Arquivo {filename} não encontrado. Criando com valores padrão.")
-        save_pid_values(default_kp, default_ki, default_kd, filename)
-        return default_kp, default_ki, default_kd
+        save_pid_values(default_kp, default_ki, default_kd, default_period, default_poll, filename)
+        return default_kp, default_ki, default_kd, default_period, default_poll
+
+def load_power_budget(filename=POWER_BUDGET_FILE):
+    """
+    Carrega o orçamento de potência das zonas de um arquivo JSON, por exemplo:
+    {"rated_watts": [800, 800, 800, 800, 400, 400], "budget_watts": 2500, "modo": "proporcional"}
+    Sem o arquivo, as zonas não têm limite de potência.
+    """
+    try:
+        with open(filename, "r") as file:
+            config = json.load(file)
+        print(f"Orçamento de potência carregado de {filename}")
+        return PowerBudget(config["rated_watts"], config["budget_watts"],
+                           modo=config.get("modo", "proporcional"),
+                           prioridades=config.get("prioridades"))
+    except:
+        print(f"Arquivo {filename} não encontrado. Sem limite de potência.")
+        return None
+
+def start_watchdog(scheduler, timeout_ms=WATCHDOG_MS):
+    """
+    Registra a alimentação do watchdog como tarefa do escalonador (chamar depois de scheduler.start()).
+    Só arma com o escalonador no core1: no core0 as telas de ajuste seguram o loop por mais que o timeout.
+    O WDT do RP2040/RP2350 não pode ser desarmado: ao sair do programa a placa reinicia após timeout_ms.
+    """
+    if timeout_ms is None:
+        return None
+    if not scheduler.on_core1:
+        print("Watchdog desativado (escalonador fora do core1)")
+        return None
+    try:
+        from machine import WDT
+        wdt = WDT(timeout=timeout_ms)
+        scheduler.add('watchdog', wdt.feed, timeout_ms // 4)
+        print(f"Watchdog ativo ({timeout_ms} ms)")
+        return wdt
+    except Exception as e:
+        print(f"Aviso watchdog: {e}")
+        return None
+
+def run_tasks(scheduler):
+    """
+    Executa as tarefas vencidas no core0 quando o core1 não está disponível.
+    """
+    if not scheduler.on_core1:
+        scheduler.run_once()
 
 def main():
     """Função principal do programa"""
     print("Iniciando Controle PID no Raspberry Pi Pico 2...")
+    wdt = None
     
     try:
         # Carrega configurações dos arquivos
         setpoint_list = read_setpoint_from_file()
-        kp_list, ki_list, kd_list = load_pid_values()
+        kp_list, ki_list, kd_list, period_list, poll_config = load_pid_values()
 
         print("Inicializando componentes...")
         
         # Inicializa os componentes
         dado = Dado()
         lcd = Lcd()
-        io = IO_MODBUS(dado=dado)
+        # Um único runtime no core1 para saídas, barramento, PID e watchdog
+        sched = Core1Scheduler()
+        io = IO_MODBUS(dado=dado, scheduler=sched, max_simultaneas=MAX_SIMULTANEAS)
         pot = KY040(val_min=1, val_max=2)
         
         pid = PIDController(
@@ -103,11 +172,17 @@ def main():
             kp_list=kp_list, 
             ki_list=ki_list, 
             kd_list=kd_list, 
-            adr=[1, 2, 3, 4, 5, 6]
+            adr=[1, 2, 3, 4, 5, 6],
+            period_list=period_list,
+            poll_policy=AdaptivePoll.from_config(6, poll_config) if poll_config is not None else None,
+            power_budget=load_power_budget(),
+            fixed_point='RP2040' in getattr(sys.implementation, '_machine', '')  # Sem FPU: PID em ponto fixo
         )
         
         print("Iniciando controle PID...")
-        pid.start(interval=1)
+        pid.start(interval=1, scheduler=sched)
+        sched.start()
+        wdt = start_watchdog(sched)
 
         # Constantes para telas adicionais
         TELA_CONFIGURACAO_PID = 3
@@ -118,9 +193,13 @@ def main():
         pot.set_limits(1, 2)
 
         print("Sistema inicializado. Entrando no loop principal...")
+        temps = [0.0] * len(pid.adr)  # Últimas temperaturas recebidas do laço de controle
         
         while True:
             try:
+                run_tasks(sched)  # Core1 indisponível: as tarefas de controle rodam entre as telas
+                pid.drain_samples(temps)  # Amostras novas do core1, sem lock
+
                 if dado.telas == dado.TELA_INICIAL:
                     lcd.lcd_display_string("**** QUALIFIX **** ", 1, 1)
                     lcd.lcd_display_string("Iniciar", 2, 1)
@@ -150,12 +229,12 @@ def main():
                     lcd.lcd_display_string("Execucao          ", 1, 1)
                     
                     # Formata temperaturas de forma segura
-                    temp1 = float(pid.value_temp[0]) if pid.value_temp[0] is not None else 0.0
-                    temp2 = float(pid.value_temp[1]) if pid.value_temp[1] is not None else 0.0
-                    temp3 = float(pid.value_temp[2]) if pid.value_temp[2] is not None else 0.0
-                    temp4 = float(pid.value_temp[3]) if pid.value_temp[3] is not None else 0.0
-                    temp5 = float(pid.value_temp[4]) if pid.value_temp[4] is not None else 0.0
-                    temp6 = float(pid.value_temp[5]) if pid.value_temp[5] is not None else 0.0
+                    temp1 = float(temps[0]) if temps[0] is not None else 0.0
+                    temp2 = float(temps[1]) if temps[1] is not None else 0.0
+                    temp3 = float(temps[2]) if temps[2] is not None else 0.0
+                    temp4 = float(temps[3]) if temps[3] is not None else 0.0
+                    temp5 = float(temps[4]) if temps[4] is not None else 0.0
+                    temp6 = float(temps[5]) if temps[5] is not None else 0.0
                     
                     lcd.lcd_display_string("1:{:.1f} 4:{:.1f}".format(temp1, temp4), 2, 1)
                     lcd.lcd_display_string("2:{:.1f} 5:{:.1f}".format(temp2, temp5), 3, 1)
@@ -218,6 +297,7 @@ def main():
                         pot.set_counter(setpoint_list[canal-1])
                         
                         while ajt == 1:
+                            run_tasks(sched)  # Tela de ajuste segura o loop: sem core1 o controle roda aqui
                             setpoint_list[canal-1] = pot.get_counter()
                             lcd.lcd_display_string("Temp: {}C".format(setpoint_list[canal-1]), 2, 1)
                             
@@ -248,6 +328,7 @@ def main():
                         pot.set_counter(int(kp_list[canal-1] * 100))
                         
                         while ajt == 1:
+                            run_tasks(sched)
                             lcd.lcd_display_string("Ajuste Kp", 1, 1)
                             kp_list[canal-1] = pot.get_counter() / 100.0
                             lcd.lcd_display_string("Kp: {:.2f}".format(kp_list[canal-1]), 2, 1)
@@ -259,6 +340,7 @@ def main():
                                 pot.set_counter(int(ki_list[canal-1] * 100))
                                 
                                 while ajt == 2:
+                                    run_tasks(sched)
                                     lcd.lcd_display_string("Ajuste Ki", 1, 1)
                                     ki_list[canal-1] = pot.get_counter() / 100.0
                                     lcd.lcd_display_string("Ki: {:.2f}".format(ki_list[canal-1]), 2, 1)
@@ -270,6 +352,7 @@ def main():
                                         pot.set_counter(int(kd_list[canal-1] * 100))
                                         
                                         while ajt == 3:
+                                            run_tasks(sched)
                                             lcd.lcd_display_string("Ajuste Kd", 1, 1)
                                             kd_list[canal-1] = pot.get_counter() / 100.0
                                             lcd.lcd_display_string("Kd: {:.2f}".format(kd_list[canal-1]), 2, 1)
@@ -278,7 +361,7 @@ def main():
                                                 ajt = 0
                                                 pot.set_limits(1, 6)  # Limita a quantidade de canais para ajuste de PID
                                                 pot.set_counter(1)
-                                                save_pid_values(kp_list, ki_list, kd_list)  # Salva os valores ajustados
+                                                save_pid_values(kp_list, ki_list, kd_list, period_list, poll_config)  # Salva os valores ajustados
                                                 pid.update_parameters(kp_list=kp_list, ki_list=ki_list, kd_list=kd_list)
                                                 dado.set_telas(dado.TELA_CONFIGURACAO)
                                                 lcd.lcd_clear()
@@ -301,12 +384,15 @@ def main():
     finally:
         # Cleanup
         try:
+            sched.stop()
             lcd.lcd_clear()
             pot.cleanup()
             io.io_rpi.cleanup()
             pid.set_control_flag(False)
             pid.stop()
             print("Cleanup concluído. Sistema encerrado.")
+            if wdt is not None:
+                print(f"Watchdog ativo: a placa reinicia em {WATCHDOG_MS // 1000} s")
         except Exception as e:
             print(f"Erro durante cleanup: {e}")
 
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Teste isolado (roda no PC) - Disparo por meios-ciclos (BurstFiring)
+Simula o trem de pulsos do detector de passagem por zero da rede de 60 Hz
+"""
+
+import sys
+from Controller.BurstFire_pico import BurstFiring
+
+REDE_HZ = 60
+SEGUNDOS = 10
+SEMICICLOS = 2 * REDE_HZ * SEGUNDOS
+
+falhas = 0
+
+def verifica(condicao, mensagem):
+    global falhas
+    if condicao:
+        print(f"✅ {mensagem}")
+    else:
+        print(f"❌ {mensagem}")
+        falhas += 1
+
+print("=" * 50)
+print("TESTE DISPARO POR PASSAGEM POR ZERO")
+print("=" * 50)
+
+# Teste 1: duty obtido igual ao comandado (resolução de um ciclo completo)
+duties = [0, 5, 25, 33.3, 50, 100]
+bits = [1 << i for i in range(len(duties))]
+burst = BurstFiring(bits, ciclo_completo=True)
+for i, duty in enumerate(duties):
+    burst.set_duty(i, duty)
+
+trem = [burst.step() for _ in range(SEMICICLOS)]  # Um step() por pulso de passagem por zero
+
+for i, duty in enumerate(duties):
+    real = burst.duty_real(i)
+    verifica(abs(real - duty) <= 100 / (REDE_HZ * SEGUNDOS),
+             f"Canal {i + 1}: comandado {duty}% -> obtido {real:.2f}%")
+
+# Teste 2: ciclo completo -> meios-ciclos positivos e negativos iguais (sem DC na carga)
+for i, bit in enumerate(bits):
+    positivos = sum(1 for k in range(0, SEMICICLOS, 2) if trem[k] & bit)
+    negativos = sum(1 for k in range(1, SEMICICLOS, 2) if trem[k] & bit)
+    verifica(positivos == negativos, f"Canal {i + 1}: sem componente DC ({positivos}/{negativos})")
+
+# Teste 3: distribuição uniforme -> maior rajada desligada curta (baixa cintilação)
+bit = bits[2]  # 25%
+maior, atual = 0, 0
+for mask in trem:
+    atual = 0 if mask & bit else atual + 1
+    maior = max(maior, atual)
+verifica(maior <= 6, f"Canal 3 (25%): maior sequência desligada = {maior} meios-ciclos")
+
+# Teste 4: modo meio-ciclo tem resolução de meio-ciclo
+burst = BurstFiring([1], ciclo_completo=False)
+burst.set_duty(0, 10)
+for _ in range(SEMICICLOS):
+    burst.step()
+verifica(abs(burst.duty_real(0) - 10) <= 100 / SEMICICLOS,
+         f"Meio-ciclo: comandado 10% -> obtido {burst.duty_real(0):.2f}%")
+
+print("=" * 50)
+if falhas:
+    print(f"❌ {falhas} verificação(ões) falharam")
+    sys.exit(1)
+print("✅ Todos os testes passaram")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Teste isolado (roda no PC) - PID em ponto fixo (MultiZonePIDFixed) x PID float (MultiZonePID)
+Os dois motores reproduzem traços gravados de aquecimento; o duty de referência foi calculado
+por um PID de referência em precisão dupla com dt variável entre amostras (integral limitada
+e congelada enquanto a saída satura no sentido do erro).
+"""
+
+import sys
+from array import array
+from Controller.PIDMulti_pico import (MultiZonePID, MultiZonePIDFixed, FIXED_TOLERANCE, FRAC_VAL,
+                                      GAIN_MAX, SMALL_INT_MAX)
+
+FLOAT_TOLERANCE = 0.01  # float32 x precisão dupla
+UM = 1 << FRAC_VAL  # 1 °C no formato do motor em ponto fixo
+
+TRACES = [
+    # Kp, Ki, Kd, setpoint e amostras (t_ms, temperatura, duty de referência)
+    (1.0, 0.5, 0.05, 180, [
+        (942, 25.0, 100), (2021, 28.9, 100), (2972, 32.8, 100), (4074, 36.6, 100),
+        (5075, 40.3, 100), (6060, 44.0, 100), (6970, 47.6, 100), (7909, 51.1, 100),
+        (8879, 54.5, 100), (9831, 57.9, 100), (10975, 61.2, 100), (12077, 64.4, 100),
+        (13080, 67.6, 100), (14105, 70.7, 100), (15067, 73.7, 100), (16124, 76.7, 100),
+        (17267, 79.7, 100), (18255, 82.5, 100), (19260, 85.3, 100), (20254, 88.1, 100),
+        (21360, 90.8, 100), (22292, 93.4, 100), (23365, 96.0, 100), (24477, 98.6, 100),
+        (25378, 101.1, 100), (26331, 103.5, 100), (27454, 105.9, 98.993), (28582, 108.2, 96.698),
+        (29683, 110.3, 94.605), (30610, 112.4, 92.487), (31587, 114.3, 90.603), (32715, 116.1, 88.82),
+        (33766, 117.8, 87.119), (34888, 119.4, 85.529), (36007, 120.9, 84.033), (36925, 122.3, 82.624),
+        (37819, 123.6, 81.327), (38876, 124.8, 80.143), (39939, 126.0, 78.944), (40992, 127.1, 77.848),
+        (42026, 128.1, 76.852), (43049, 129.1, 75.851), (44053, 130.0, 74.955), (45125, 130.9, 74.058),
+        (46252, 131.7, 73.265), (47394, 132.4, 72.569), (48327, 133.1, 71.862), (49395, 133.8, 71.167),
+        (50529, 134.5, 70.469), (51613, 135.0, 69.977), (52467, 135.6, 69.365), (53448, 136.1, 68.875),
+        (54504, 136.6, 68.376), (55639, 137.1, 67.878), (56701, 137.5, 67.481), (57628, 137.9, 67.078),
+        (58568, 138.3, 66.679), (59570, 138.7, 66.28), (60467, 139.0, 65.983), (61593, 139.3, 65.687),
+    ]),
+    # Kp, Ki, Kd, setpoint e amostras (t_ms, temperatura, duty de referência)
+    (2.5, 0.2, 0.5, 120, [
+        (1118, 23.9, 100), (2076, 33.9, 100), (2965, 43.4, 100), (4108, 52.3, 100),
+        (5076, 60.9, 100), (6079, 69.0, 100), (7120, 76.7, 100), (8138, 84.0, 93.744),
+        (9124, 90.3, 81.055), (10061, 95.1, 69.689), (11119, 98.4, 62.44), (12178, 100.9, 56.57),
+        (13033, 102.7, 52.197), (14105, 103.9, 49.69), (14978, 104.8, 47.485), (16033, 105.5, 45.918),
+        (16993, 105.9, 45.042), (18034, 106.3, 44.058), (19108, 106.5, 43.657), (20125, 106.7, 43.152),
+        (21108, 106.9, 42.648), (22243, 106.9, 42.75), (23364, 107.0, 42.455), (24326, 107.1, 42.198),
+        (25415, 107.1, 42.25), (26426, 107.1, 42.25), (27323, 107.1, 42.25), (28448, 107.1, 42.25),
+        (29549, 107.2, 41.955), (30658, 107.1, 42.295), (31714, 107.2, 41.953), (32797, 107.1, 42.296),
+        (33907, 107.2, 41.955), (34854, 107.2, 42.0), (35808, 107.2, 42.0), (36861, 107.1, 42.297),
+        (37897, 107.2, 41.952), (39042, 107.2, 42.0), (40001, 107.1, 42.302), (40922, 107.2, 41.946),
+        (41932, 107.2, 42.0), (42848, 107.1, 42.305), (43926, 107.2, 41.954), (45045, 107.2, 42.0),
+        (46157, 107.1, 42.295), (47219, 107.2, 41.953), (48324, 107.2, 42.0), (49314, 107.1, 42.301),
+        (50433, 107.2, 41.955), (51462, 107.2, 42.0), (52544, 107.2, 42.0), (53540, 107.1, 42.3),
+        (54397, 107.2, 41.942), (55513, 107.2, 42.0), (56473, 107.1, 42.302), (57475, 107.2, 41.95),
+        (58445, 107.2, 42.0), (59329, 107.1, 42.307), (60269, 107.2, 41.947), (61398, 107.2, 42.0),
+    ]),
+    # Kp, Ki, Kd, setpoint e amostras (t_ms, temperatura, duty de referência)
+    (0.8, 1.0, 0.0, 60, [
+        (1085, 23.0, 69.745), (2184, 43.9, 62.88), (3130, 62.0, 46.508), (4145, 74.3, 22.154),
+        (5216, 78.9, 0), (6166, 76.7, 4.368), (7184, 75.9, 0), (8317, 73.7, 0),
+        (9357, 71.7, 0), (10239, 69.8, 1.245), (11163, 68.3, 0), (12059, 66.5, 0),
+        (13041, 64.7, 0.709), (13999, 63.3, 0), (14885, 61.7, 1.603), (15812, 60.6, 1.927),
+        (16669, 59.7, 2.904), (17621, 59.1, 4.241), (18618, 58.9, 5.498), (19588, 59.1, 6.211),
+        (20515, 59.5, 6.354), (21468, 60.0, 5.954), (22336, 60.3, 5.454), (23351, 60.4, 4.968),
+        (24229, 60.4, 4.617), (25161, 60.3, 4.417), (26294, 60.1, 4.464), (27443, 60.0, 4.544),
+        (28558, 59.9, 4.735), (29578, 59.8, 5.019), (30573, 59.9, 5.039), (31542, 59.9, 5.136),
+        (32580, 60.0, 5.056), (33616, 60.0, 5.056), (34525, 60.0, 5.056), (35453, 60.1, 4.883),
+        (36408, 60.1, 4.787), (37376, 60.0, 4.867), (38323, 60.0, 4.867), (39305, 60.0, 4.867),
+        (40351, 59.9, 5.052), (41377, 60.0, 4.972), (42478, 60.0, 4.972), (43478, 60.0, 4.972),
+        (44527, 60.0, 4.972), (45494, 60.0, 4.972), (46545, 60.0, 4.972), (47450, 60.1, 4.801),
+        (48482, 60.0, 4.881), (49533, 60.0, 4.881), (50418, 60.0, 4.881), (51451, 60.0, 4.881),
+        (52585, 59.9, 5.075), (53653, 60.0, 4.995), (54782, 60.0, 4.995), (55756, 60.0, 4.995),
+        (56874, 60.0, 4.995), (57759, 60.1, 4.826), (58906, 60.0, 4.906), (59930, 60.0, 4.906),
+    ]),
+]
+
+falhas = 0
+
+def verifica(condicao, mensagem):
+    global falhas
+    if condicao:
+        print(f"✅ {mensagem}")
+    else:
+        print(f"❌ {mensagem}")
+        falhas += 1
+
+def reproduz(motor_cls):
+    """Roda todas as zonas juntas (um compute_all por amostra) e retorna o maior desvio por zona"""
+    n = len(TRACES)
+    motor = motor_cls([z[0] for z in TRACES], [z[1] for z in TRACES],
+                      [z[2] for z in TRACES], [z[3] for z in TRACES], now=0)
+    medidas = array('f', [0] * n)
+    instantes = array('i', [0] * n)
+    saidas = array('f', [0] * n)
+    desvios = [0.0] * n
+    for k in range(len(TRACES[0][4])):
+        for i, zona in enumerate(TRACES):
+            instantes[i], medidas[i], _ = zona[4][k]
+        motor.compute_all(medidas, instantes, saidas)
+        for i, zona in enumerate(TRACES):
+            desvios[i] = max(desvios[i], abs(saidas[i] - zona[4][k][2]))
+    return desvios
+
+print("=" * 50)
+print("TESTE PID PONTO FIXO x FLOAT")
+print("=" * 50)
+
+# Teste 1: motor float reproduz a referência
+for i, desvio in enumerate(reproduz(MultiZonePID)):
+    verifica(desvio <= FLOAT_TOLERANCE, f"Float, zona {i + 1}: desvio máximo {desvio:.4f}%")
+
+# Teste 2: motor em ponto fixo dentro da tolerância documentada
+for i, desvio in enumerate(reproduz(MultiZonePIDFixed)):
+    verifica(desvio <= FIXED_TOLERANCE, f"Ponto fixo, zona {i + 1}: desvio máximo {desvio:.4f}% (limite {FIXED_TOLERANCE}%)")
+
+# Teste 3: anti-windup - em saturação a integral fica dentro de [integral_min, integral_max]
+# (frio: saída presa em 100%; depois superaquecido: saída presa em 0%)
+saida = array('f', [0])
+for motor_cls, escala in ((MultiZonePID, 1), (MultiZonePIDFixed, UM)):
+    motor = motor_cls([1.0], [0.5], [0.0], [180], now=0)
+    fora = 0
+    extremos = [0.0, 0.0]
+    for k in range(1, 601):
+        motor.compute_all([25.0 if k <= 300 else 300.0], [k * 1000], saida)
+        integral = motor.integral[0] / escala
+        extremos[0] = min(extremos[0], integral)
+        extremos[1] = max(extremos[1], integral)
+        if not -50 <= integral <= 50:
+            fora += 1
+    verifica(fora == 0, f"{motor_cls.__name__}: integral em saturação entre {extremos[0]:.2f} e {extremos[1]:.2f} °C·s (limites ±50)")
+# Sem saturar a saída, a integral encosta no limite e para ali
+motor = MultiZonePIDFixed([0.1], [0.1], [0.0], [100], now=0)
+for k in range(1, 11):
+    motor.compute_all([90.0], [k * 1000], saida)
+verifica(motor.integral[0] == 50 * UM, f"Integral limitada em {motor.integral[0] / UM:.2f} °C·s")
+motor = MultiZonePIDFixed([0.1], [0.1], [0.0], [100], now=0)
+motor.compute_all([90.0], [1000], saida)
+antes = motor.integral[0]
+motor.limit_feedback(0)
+verifica(motor.integral[0] == antes - 10 * UM, "limit_feedback desfaz a integração do último passo")
+
+# Teste 4: com os ganhos do main (Kp=30) e erro de 300 °C, nenhum produto passa de small int
+for ganho in (30.0, GAIN_MAX):
+    motor = MultiZonePIDFixed([ganho], [ganho], [ganho], [300], now=0)
+    maior = 0
+    # Frio (erro de 300 °C), salto de leitura espúria em 100 ms e volta
+    for t, medida in ((1000, 0.0), (2000, 0.0), (2100, 300.0), (2200, 0.0), (3200, -1.0)):
+        motor.compute_all([medida], [t], saida)
+        termos = (motor.kp[0] * motor._error_q[0], motor.ki[0] * motor.integral[0],
+                  motor.kd[0] * motor._rate_q[0])
+        maior = max([maior, abs(sum(termos))] + [abs(x) for x in termos])
+    verifica(maior < SMALL_INT_MAX, f"Kp=Ki=Kd={ganho:g}, erro de 300 °C: maior intermediário {maior} < 2**30")
+
+print("=" * 50)
+if falhas:
+    print(f"❌ {falhas} verificação(ões) falharam")
+    sys.exit(1)
+print("✅ Todos os testes passaram")